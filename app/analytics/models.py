@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Date, Integer, MetaData, Numeric, String, Table, Uuid
+
+# Материализованные вьюхи создаются миграцией, поэтому держим их
+# в отдельной MetaData, чтобы alembic autogenerate их не трогал
+views_metadata = MetaData()
+
+sales_daily = Table(
+    "sales_daily",
+    views_metadata,
+    Column("day", Date, primary_key=True),
+    Column("status", String, primary_key=True),
+    Column("orders_count", Integer),
+    Column("amount", Numeric(12, 2)),
+    Column("amount_paid", Numeric(12, 2)),
+    Column("delivery_price_sum", Numeric(12, 2)),
+    Column("delivery_count", Integer),
+)
+
+product_sales = Table(
+    "product_sales",
+    views_metadata,
+    Column("product_id", Uuid, primary_key=True),
+    Column("name", String),
+    Column("orders_count", Integer),
+    Column("quantity", Integer),
+    Column("revenue", Numeric(12, 2)),
+)
+
+MATERIALIZED_VIEWS = [sales_daily.name, product_sales.name]
@@ -0,0 +1,67 @@
+import asyncio
+import contextlib
+import logging
+import uuid
+
+from sqlalchemy import text
+
+from app.analytics.models import MATERIALIZED_VIEWS
+from app.db import engine
+from app.services.redis import RELEASE_LOCK_SCRIPT, redis_client
+from app.settings import settings
+
+REFRESH_LOCK_KEY = "analytics_refresh_lock"
+# Не обновляем чаще, чем раз в столько секунд, даже если оплаты сыпятся подряд
+MIN_REFRESH_INTERVAL = 30
+
+log = logging.getLogger(__name__)
+
+_refresh_requested = asyncio.Event()
+
+
+def request_refresh():
+    """
+    Попросить фоновую задачу обновить вьюхи (например, после оплаты). Если
+    блокировка у другого воркера, обновление повторяется после ее снятия.
+    """
+    _refresh_requested.set()
+
+
+async def refresh_views() -> bool:
+    """Обновление материализованных вьюх, одновременно только в одном воркере"""
+    token = uuid.uuid4().hex
+    lock = await redis_client.set(
+        REFRESH_LOCK_KEY, token, nx=True, ex=settings.ANALYTICS_REFRESH_SECONDS
+    )
+    if not lock:
+        return False
+    try:
+        async with engine.begin() as connection:
+            for view in MATERIALIZED_VIEWS:
+                await connection.execute(
+                    text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                )
+    finally:
+        await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, REFRESH_LOCK_KEY, token)
+    return True
+
+
+async def refresh_loop():
+    """Периодическое обновление вьюх, плюс внеочередное по request_refresh"""
+    while True:
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                _refresh_requested.wait(), timeout=settings.ANALYTICS_REFRESH_SECONDS
+            )
+        requested = _refresh_requested.is_set()
+        _refresh_requested.clear()
+        try:
+            refreshed = await refresh_views()
+        except Exception as e:
+            log.exception("Error refreshing analytics views: %s", e)
+        else:
+            # Вьюхи сейчас обновляет другой воркер, но его снимок мог начаться
+            # раньше изменений, ради которых просили обновить: повторяем позже
+            if requested and not refreshed:
+                _refresh_requested.set()
+        await asyncio.sleep(MIN_REFRESH_INTERVAL)
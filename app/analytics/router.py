@@ -0,0 +1,114 @@
+from datetime import date
+from typing import Annotated, List, Literal, Optional
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy import Date, cast, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth.dependencies import get_admin_user
+from app.db import get_session
+from app.orders.models import OrderStatus
+from .models import product_sales, sales_daily
+from .refresh import request_refresh
+from .schemas import ProductSalesRow, RevenueRow, SalesSummary, StatusRow
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    dependencies=[Depends(get_admin_user)],
+)
+
+
+def _period_filters(query, date_from: Optional[date], date_to: Optional[date]):
+    if date_from:
+        query = query.where(sales_daily.c.day >= date_from)
+    if date_to:
+        query = query.where(sales_daily.c.day <= date_to)
+    return query
+
+
+def _avg_delivery_price():
+    return func.sum(sales_daily.c.delivery_price_sum) / func.nullif(
+        func.sum(sales_daily.c.delivery_count), 0
+    )
+
+
+@router.get("/revenue", response_model=List[RevenueRow])
+async def get_revenue(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    period: Literal["day", "week", "month"] = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[List[OrderStatus]] = Query(None),
+):
+    """Выручка и количество заявок по дням, неделям или месяцам"""
+    period_column = cast(func.date_trunc(period, sales_daily.c.day), Date).label(
+        "period"
+    )
+    query = select(
+        period_column,
+        func.sum(sales_daily.c.orders_count).label("orders_count"),
+        func.sum(sales_daily.c.amount).label("amount"),
+        func.sum(sales_daily.c.amount_paid).label("amount_paid"),
+        _avg_delivery_price().label("avg_delivery_price"),
+    )
+    query = _period_filters(query, date_from, date_to)
+    if status:
+        query = query.where(sales_daily.c.status.in_([s.name for s in status]))
+    query = query.group_by(period_column).order_by(period_column)
+    rows = (await session.exec(query)).mappings().all()
+    return [RevenueRow(**row) for row in rows]
+
+
+@router.get("/statuses", response_model=List[StatusRow])
+async def get_statuses(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """Количество и сумма заявок в разрезе статусов"""
+    query = select(
+        sales_daily.c.status,
+        func.sum(sales_daily.c.orders_count).label("orders_count"),
+        func.sum(sales_daily.c.amount).label("amount"),
+        func.sum(sales_daily.c.amount_paid).label("amount_paid"),
+    )
+    query = _period_filters(query, date_from, date_to).group_by(sales_daily.c.status)
+    rows = (await session.exec(query)).mappings().all()
+    # В базе enum хранится по имени (PAID), отдаем значение (paid)
+    return [StatusRow(**{**row, "status": OrderStatus[row["status"]]}) for row in rows]
+
+
+@router.get("/top_products", response_model=List[ProductSalesRow])
+async def get_top_products(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    by: Literal["quantity", "revenue"] = "quantity",
+    limit: Annotated[int, Query(le=100)] = 10,
+):
+    """Самые продаваемые товары по количеству или выручке"""
+    query = select(product_sales).order_by(product_sales.c[by].desc()).limit(limit)
+    rows = (await session.exec(query)).mappings().all()
+    return [ProductSalesRow(**row) for row in rows]
+
+
+@router.get("/summary", response_model=SalesSummary)
+async def get_summary(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+):
+    """Итоги за период, включая среднюю цену доставки"""
+    query = select(
+        func.coalesce(func.sum(sales_daily.c.orders_count), 0).label("orders_count"),
+        func.coalesce(func.sum(sales_daily.c.amount), 0).label("amount"),
+        func.coalesce(func.sum(sales_daily.c.amount_paid), 0).label("amount_paid"),
+        _avg_delivery_price().label("avg_delivery_price"),
+    )
+    query = _period_filters(query, date_from, date_to)
+    row = (await session.exec(query)).mappings().one()
+    return SalesSummary(**row)
+
+
+@router.post("/refresh", status_code=status.HTTP_202_ACCEPTED)
+async def refresh_analytics():
+    """Внеочередное обновление материализованных вьюх фоновой задачей"""
+    request_refresh()
+    return {"scheduled": True}
@@ -0,0 +1,37 @@
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+import uuid
+from pydantic import BaseModel
+
+from app.orders.models import OrderStatus
+
+
+class RevenueRow(BaseModel):
+    period: date
+    orders_count: int
+    amount: Decimal
+    amount_paid: Decimal
+    avg_delivery_price: Optional[Decimal] = None
+
+
+class StatusRow(BaseModel):
+    status: OrderStatus
+    orders_count: int
+    amount: Decimal
+    amount_paid: Decimal
+
+
+class ProductSalesRow(BaseModel):
+    product_id: uuid.UUID
+    name: str
+    orders_count: int
+    quantity: int
+    revenue: Decimal
+
+
+class SalesSummary(BaseModel):
+    orders_count: int
+    amount: Decimal
+    amount_paid: Decimal
+    avg_delivery_price: Optional[Decimal] = None
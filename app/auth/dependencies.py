@@ -3,8 +3,11 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session, select
 from app.db import get_session
-from app.users.models import User
-from app.auth.utils import verify_token
+from app.users.models import User, UserRole
+from app.users.schemas import TokenData
+from app.auth.utils import decode_access_token, verify_token
+from app.auth.user_cache import user_cache
+from app.services.server_timing import timed
 
 security = HTTPBearer(auto_error=False)
 
@@ -22,23 +25,73 @@ async def get_current_user(
     if credentials is None:
         return None
 
-    email = verify_token(credentials.credentials)
-    if email is None:
-        return None
+    with timed("auth"):
+        email = verify_token(credentials.credentials)
+        if email is None:
+            return None
+
+        return await load_user(session, email)
+
+
+async def load_user(session: Session, email: str) -> Optional[User]:
+    """Пользователь по email: из кэша, иначе из базы"""
+    user = user_cache.get(email)
+    if user is not None:
+        return user
 
     user = (await session.exec(select(User).where(User.email == email))).first()
     if user is None:
         return None
 
+    user_cache.put(user)
     return user
 
 
+async def get_token_data(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> Optional[TokenData]:
+    """Claims проверенного токена доступа, без обращения к базе"""
+    if credentials is None:
+        return None
+    with timed("auth"):
+        return decode_access_token(credentials.credentials)
+
+
 async def get_admin_user(
-    current_user: Optional[User] = Depends(get_current_user),
+    token_data: Optional[TokenData] = Depends(get_token_data),
+    session: Session = Depends(get_session),
+) -> TokenData:
+    """Получение пользователя с ролью админа (по claims токена)"""
+    if token_data and token_data.role is None:
+        # Токен выдан до появления claims: роль берем из базы
+        with timed("auth"):
+            user = await load_user(session, token_data.email)
+        token_data = (
+            TokenData(email=user.email, user_id=user.id, role=user.role)
+            if user
+            else None
+        )
+    if not token_data or token_data.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+        )
+    return token_data
+
+
+async def get_verified_admin_user(
+    token_data: TokenData = Depends(get_admin_user),
+    session: Session = Depends(get_session),
 ) -> User:
-    """Получение пользователя с ролью админа"""
-    if not current_user or current_user.role != "admin":
+    """
+    Админ, перепроверенный по базе в обход кэша. Для чувствительных изменений:
+    роль могли отозвать, а токен доступа еще не истек.
+    """
+    with timed("auth"):
+        user = (
+            await session.exec(select(User).where(User.email == token_data.email))
+        ).first()
+    if not user or user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
         )
-    return current_user
+    return user
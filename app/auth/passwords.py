@@ -0,0 +1,94 @@
+import asyncio
+import statistics
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.auth.utils import pwd_context
+from app.settings import settings
+
+# bcrypt отпускает GIL на время хеширования, поэтому хватает потоков
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password"
+)
+
+
+class PasswordPool:
+    """
+    Хеширование и проверка паролей вне event loop, в отдельном пуле потоков.
+    Больше PASSWORD_HASH_QUEUE_LIMIT операций одновременно не принимаем:
+    лучше быстро ответить 503 на всплеск логинов, чем копить очередь.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.counters = Counter()
+        self.queue_ms = deque(maxlen=1000)
+        self.run_ms = deque(maxlen=1000)
+
+    async def run(self, func, *args):
+        if self.in_flight >= self.limit:
+            self.counters["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts, try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        self.counters["calls"] += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            self.queue_ms.append((started - submitted) * 1000)
+            try:
+                return func(*args)
+            finally:
+                self.run_ms.append((time.perf_counter() - started) * 1000)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_executor, timed)
+        finally:
+            self.in_flight -= 1
+
+    def metrics(self) -> dict:
+        def percentiles(values) -> dict:
+            if not values:
+                return {"p50": None, "p95": None}
+            ordered = sorted(values)
+            return {
+                "p50": round(statistics.median(ordered), 2),
+                "p95": round(ordered[int(len(ordered) * 0.95) - 1], 2),
+            }
+
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "limit": self.limit,
+            "queue_ms": percentiles(self.queue_ms),
+            "run_ms": percentiles(self.run_ms),
+        }
+
+
+password_pool = PasswordPool(settings.PASSWORD_HASH_QUEUE_LIMIT)
+
+
+async def hash_password(password: str) -> str:
+    """Хеширование пароля в пуле"""
+    return await password_pool.run(pwd_context.hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Проверка пароля в пуле. Если хеш сделан с другой стоимостью (BCRYPT_ROUNDS
+    поменяли), вторым значением возвращается новый хеш для сохранения.
+    """
+    return await password_pool.run(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
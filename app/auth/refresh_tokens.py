@@ -0,0 +1,50 @@
+import hashlib
+import secrets
+import uuid
+from typing import Optional
+
+from app.services.redis import redis_client
+from app.settings import settings
+
+REFRESH_TOKEN_PREFIX = "refresh_token:"
+USER_TOKENS_PREFIX = "user_refresh_tokens:"
+REFRESH_TOKEN_TTL = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+
+
+def _token_key(token: str) -> str:
+    # В Redis лежит только хеш, сам токен знает лишь клиент
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def issue_refresh_token(user_id: uuid.UUID) -> str:
+    """Новый одноразовый refresh токен пользователя"""
+    token = secrets.token_urlsafe(32)
+    key = _token_key(token)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(f"{REFRESH_TOKEN_PREFIX}{key}", str(user_id), ex=REFRESH_TOKEN_TTL)
+        pipe.sadd(f"{USER_TOKENS_PREFIX}{user_id}", key)
+        pipe.expire(f"{USER_TOKENS_PREFIX}{user_id}", REFRESH_TOKEN_TTL)
+        await pipe.execute()
+    return token
+
+
+async def consume_refresh_token(token: str) -> Optional[uuid.UUID]:
+    """
+    Погасить refresh токен при ротации. Каждый токен срабатывает один раз:
+    повторный запрос с тем же токеном получит None.
+    """
+    key = _token_key(token)
+    user_id = await redis_client.getdel(f"{REFRESH_TOKEN_PREFIX}{key}")
+    if user_id is None:
+        return None
+    await redis_client.srem(f"{USER_TOKENS_PREFIX}{user_id}", key)
+    return uuid.UUID(user_id)
+
+
+async def revoke_user_tokens(user_id: uuid.UUID):
+    """Отозвать все refresh токены пользователя (смена роли, пароля, удаление)"""
+    keys = await redis_client.smembers(f"{USER_TOKENS_PREFIX}{user_id}")
+    await redis_client.delete(
+        f"{USER_TOKENS_PREFIX}{user_id}",
+        *(f"{REFRESH_TOKEN_PREFIX}{key}" for key in keys),
+    )
@@ -0,0 +1,108 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Optional, Tuple
+
+from app.services.redis import redis_client
+from app.settings import settings
+from app.users.models import User
+
+INVALIDATE_CHANNEL = "user_cache_invalidate"
+RECONNECT_SECONDS = 5
+
+log = logging.getLogger(__name__)
+
+
+class UserCache:
+    """
+    TTL+LRU кэш пользователей по email из токена, в памяти воркера.
+    Изменения пользователей рассылаются всем воркерам через Redis pub/sub.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        # Без подписки на сброс кэшу верить нельзя
+        self._connected = False
+        self.counters = Counter()
+
+    def get(self, email: str) -> Optional[User]:
+        item = self._items.get(email) if self._connected else None
+        if item is None:
+            self.counters["misses"] += 1
+            return None
+        expires_at, data = item
+        if expires_at < time.monotonic():
+            del self._items[email]
+            self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            return None
+        self._items.move_to_end(email)
+        self.counters["hits"] += 1
+        # Каждому запросу свой экземпляр, общий словарь никто не изменит
+        return User(**data)
+
+    def put(self, user: User):
+        if not self._connected:
+            return
+        self._items[user.email] = (time.monotonic() + self.ttl, user.model_dump())
+        self._items.move_to_end(user.email)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def discard(self, email: str):
+        if self._items.pop(email, None) is not None:
+            self.counters["invalidations"] += 1
+
+    async def invalidate(self, *emails: str):
+        """Сбросить пользователей во всех воркерах"""
+        for email in emails:
+            self.discard(email)
+            await redis_client.publish(INVALIDATE_CHANNEL, email)
+
+    def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _listen(self):
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                # Пока не были подписаны, могли пропустить сообщения
+                self._items.clear()
+                self._connected = True
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.discard(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("User cache listener error: %s", e)
+            finally:
+                self._connected = False
+                with contextlib.suppress(Exception):
+                    await pubsub.close()
+            self._items.clear()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    def metrics(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
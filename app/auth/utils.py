@@ -1,18 +1,32 @@
 from datetime import datetime, timedelta
+import logging
 import os
 from typing import Optional
+import uuid
 from fastapi import UploadFile
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.settings import settings
+from app.users.models import User, UserRole
+from app.users.schemas import TokenData
 
-# Настройки для хеширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+log = logging.getLogger(__name__)
+
+# Настройки для хеширования паролей. Хеши с другой стоимостью считаются
+# устаревшими и перехешируются при входе
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 # Настройки JWT
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+ORDER_STATUS_TOKEN_EXPIRE_DAYS = 7
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -38,16 +52,67 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def create_user_access_token(user: User) -> str:
+    """Короткоживущий токен доступа с ролью и id пользователя в claims"""
+    return create_access_token(
+        {"sub": user.email, "uid": str(user.id), "role": user.role.value}
+    )
+
+
+def decode_access_token(token: str) -> Optional[TokenData]:
+    """Проверка JWT токена доступа, claims без обращения к базе"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    email: str = payload.get("sub")
+    # Токены со scope (например, статус заявки) не дают доступа к API
+    if email is None or payload.get("scope"):
+        return None
+    try:
+        # Токены, выданные до появления claims, содержат только sub
+        return TokenData(
+            email=email, user_id=payload.get("uid"), role=payload.get("role")
+        )
+    except ValueError:
+        return None
+
+
 def verify_token(token: str) -> Optional[str]:
     """Проверка JWT токена"""
+    token_data = decode_access_token(token)
+    return token_data.email if token_data else None
+
+
+def is_admin_scope(scope) -> bool:
+    """Есть ли в ASGI запросе токен админа (по claims, для middleware)"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            token_data = decode_access_token(token)
+            return token_data is not None and token_data.role == UserRole.ADMIN
+    return False
+
+
+def create_order_status_token(order_id: uuid.UUID) -> str:
+    """Токен покупателя для просмотра статуса своей заявки"""
+    return create_access_token(
+        {"sub": str(order_id), "scope": "order_status"},
+        expires_delta=timedelta(days=ORDER_STATUS_TOKEN_EXPIRE_DAYS),
+    )
+
+
+def verify_order_status_token(token: str, order_id: uuid.UUID) -> bool:
+    """Проверка токена статуса заявки"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
-        return None
+        return False
+    return payload.get("scope") == "order_status" and payload.get("sub") == str(
+        order_id
+    )
 
 
 async def download_file(file: UploadFile, dir: str) -> str:
@@ -66,4 +131,4 @@ async def remove_file(path: str) -> str:
     try:
         os.remove(path.replace(f"{settings.SERVER_HOST}/", ""))
     except Exception as e:
-        print(f"Error when deleting file {path}\n{e}")
+        log.warning("Error when deleting file %s: %s", path, e)
@@ -37,7 +37,6 @@ async def read_category(
     client: Annotated[Optional[User], Depends(get_current_user)],
 ):
     category = await session.get(Category, id)
-    print(client)
 
     # Check if id exists. If not, return 404 not found response
     if not category or (
@@ -6,12 +6,19 @@ from sqlalchemy.orm import sessionmaker
 
 from app.settings import settings
 
+# SQL в лог: LOG_LEVELS={"sqlalchemy.engine": "INFO"}, через общую очередь логов
 engine = AsyncEngine(
-    create_engine(settings.POSTGRES_URL.unicode_string(), echo=True, future=True)
+    create_engine(settings.POSTGRES_URL.unicode_string(), future=True)
 )
 
+async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
 
 async def get_session() -> AsyncSession:
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    """
+    Одна сессия на запрос: FastAPI кэширует зависимость, поэтому обработчик
+    и get_current_user получают один и тот же объект. Соединение берется
+    из пула только при первом запросе к базе, а не при создании сессии.
+    """
     async with async_session() as session:
         yield session
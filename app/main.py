@@ -1,30 +1,70 @@
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi_limiter import FastAPILimiter
-import redis.asyncio as redis
 
 from app.settings import settings
+from app.services.logging_config import (
+    RequestIdMiddleware,
+    setup_logging,
+    stop_logging,
+)
+from app.services.responses import FastJSONResponse
+from app.services.metrics import (
+    MetricsMiddleware,
+    instrument_engine,
+    mark_process_dead,
+    metrics_response,
+    rate_limit_callback,
+)
+from app.services.redis import redis_client
+from app.services import tracing
+from app.services.tracing import TracingMiddleware
+from app.services.server_timing import ServerTimingMiddleware
+from app.services.profiling import ProfilingMiddleware
+from app.db import engine
 from app.products.router import router as products_router
 from app.users.router import router as users_router
 from app.orders.router import router as orders_router
 from app.categories.router import router as categories_router
+from app.analytics.router import router as analytics_router
+from app.profiles.router import router as profiles_router
+from app.analytics.refresh import refresh_loop
+from app.orders.events import order_events
+from app.orders.status_channel import order_status_hub
+from app.auth.user_cache import user_cache
+from app.services.logger import logger
+
+setup_logging()
+tracing.setup_tracing()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis_client = redis.from_url(
-        settings.REDIS_URL.unicode_string(), encoding="utf-8", decode_responses=True
-    )
-    await FastAPILimiter.init(redis_client)
+    await FastAPILimiter.init(redis_client, http_callback=rate_limit_callback)
+    logger.start()
+    analytics_task = asyncio.create_task(refresh_loop())
+    order_events.start()
+    order_status_hub.start()
+    user_cache.start()
     yield  # App runs here
+    await user_cache.stop()
+    await order_status_hub.stop()
+    await order_events.stop()
+    analytics_task.cancel()
+    await logger.stop()
+    tracing.stop_tracing()
+    stop_logging()
+    mark_process_dead()
 
 
 app = FastAPI(
     title="Metal products",
     description="Website for selling metal products",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     openapi_url="/api/openapi.json" if settings.DEBUG else None,
     docs_url="/api/docs" if settings.DEBUG else None,
     redoc_url="/api/redoc" if settings.DEBUG else None,
@@ -42,8 +82,26 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
 )
+# Внутри RequestIdMiddleware: id запроса попадает в имя файла профиля
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestIdMiddleware)
+if settings.SERVER_TIMING or settings.DEBUG:
+    app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+tracing.instrument_engine(engine)
 app.mount("/api/static", StaticFiles(directory="static"), name="static")
 app.include_router(products_router, prefix="/api")
 app.include_router(orders_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
 app.include_router(categories_router, prefix="/api")
+app.include_router(analytics_router, prefix="/api")
+app.include_router(profiles_router, prefix="/api")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Метрики Prometheus, суммарно по всем воркерам"""
+    return metrics_response(request)
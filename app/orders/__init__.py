@@ -1 +1,7 @@
-from .models import Order, OrderDetail, OrderProductLink
+from .models import (
+    ArchivedOrder,
+    ArchivedProductSales,
+    Order,
+    OrderDetail,
+    OrderProductLink,
+)
@@ -0,0 +1,175 @@
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.orders.models import (
+    FINAL_ORDER_STATUSES,
+    ArchivedOrder,
+    ArchivedProductSales,
+    Order,
+    OrderDetail,
+    OrderProductLink,
+    OrderStatus,
+)
+from app.orders.schemas import OrderRead
+from app.settings import settings
+
+# Продажи по товарам считаем только по оплаченным, как и вьюха product_sales
+SOLD_STATUSES = (OrderStatus.PAID, OrderStatus.SUCCESS)
+HOT_TABLES = ['"order"', "orderdetail", "orderproductlink"]
+
+
+def _write_ndjson_gz(path: str, lines: List[str]):
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+        for line in lines:
+            file.write(line + "\n")
+    with open(tmp_path, "rb") as file:
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_order_from_file(path: str, order_id: str) -> Optional[dict]:
+    prefix = f'{{"id":"{order_id}"'
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            # id всегда первым ключом, чужие строки целиком не парсим
+            if line.startswith(prefix):
+                return json.loads(line)
+    return None
+
+
+async def archive_batch(
+    session: AsyncSession, cutoff: datetime, batch_size: int, directory: str
+) -> int:
+    """
+    Перенос одной пачки финальных заявок старше cutoff в NDJSON.gz файл.
+    Файл пишется до удаления строк; если транзакция не прошла, файл удаляется.
+    """
+    orders = (
+        await session.exec(
+            select(Order)
+            .where(
+                Order.status.in_(FINAL_ORDER_STATUSES),
+                Order.created_at < cutoff,
+            )
+            .order_by(Order.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .options(selectinload(Order.product_links), selectinload(Order.detail))
+        )
+    ).all()
+    if not orders:
+        await session.rollback()
+        return 0
+
+    os.makedirs(directory, exist_ok=True)
+    file_name = f"orders_{orders[0].created_at:%Y%m%d}_{orders[0].id}.ndjson.gz"
+    lines = [OrderRead.model_validate(order).model_dump_json() for order in orders]
+    path = os.path.join(directory, file_name)
+    await run_in_threadpool(_write_ndjson_gz, path, lines)
+
+    try:
+        order_ids = [order.id for order in orders]
+        session.add_all(
+            ArchivedOrder(
+                order_id=order.id,
+                file=file_name,
+                status=order.status,
+                amount=order.amount or Decimal(),
+                amount_paid=order.amount_paid or Decimal(),
+                delivery_price=order.detail.delivery_price if order.detail else None,
+                created_at=order.created_at,
+            )
+            for order in orders
+        )
+
+        sales = {}
+        for order in orders:
+            if order.status not in SOLD_STATUSES:
+                continue
+            for link in order.product_links:
+                row = sales.setdefault(
+                    link.product_id,
+                    {
+                        "product_id": link.product_id,
+                        "product_name": link.product_name,
+                        "orders_count": 0,
+                        "quantity": 0,
+                        "revenue": Decimal(),
+                    },
+                )
+                row["orders_count"] += 1
+                row["quantity"] += link.quantity
+                row["revenue"] += link.unit_price * link.quantity
+        if sales:
+            statement = insert(ArchivedProductSales).values(list(sales.values()))
+            await session.exec(
+                statement.on_conflict_do_update(
+                    index_elements=[ArchivedProductSales.product_id],
+                    set_={
+                        "product_name": statement.excluded.product_name,
+                        "orders_count": ArchivedProductSales.orders_count
+                        + statement.excluded.orders_count,
+                        "quantity": ArchivedProductSales.quantity
+                        + statement.excluded.quantity,
+                        "revenue": ArchivedProductSales.revenue
+                        + statement.excluded.revenue,
+                    },
+                )
+            )
+
+        await session.exec(
+            delete(OrderProductLink).where(OrderProductLink.order_id.in_(order_ids))
+        )
+        await session.exec(
+            delete(OrderDetail).where(OrderDetail.order_id.in_(order_ids))
+        )
+        await session.exec(delete(Order).where(Order.id.in_(order_ids)))
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        os.remove(path)
+        raise
+    # Удаленные заявки не должны остаться в identity map длинной сессии
+    session.expunge_all()
+    return len(orders)
+
+
+async def load_archived_order(
+    session: AsyncSession, order_id: uuid.UUID
+) -> Optional[dict]:
+    """Заявка из архива по индексу ArchivedOrder, в формате OrderRead"""
+    archived = await session.get(ArchivedOrder, order_id)
+    if not archived:
+        return None
+    path = os.path.join(settings.ORDER_ARCHIVE_DIR, archived.file)
+    return await run_in_threadpool(_read_order_from_file, path, str(order_id))
+
+
+async def table_sizes(session: AsyncSession) -> dict:
+    """Размер горячих таблиц и их индексов в байтах"""
+    sizes = {}
+    for table in HOT_TABLES:
+        row = (
+            await session.exec(
+                text(
+                    "SELECT pg_table_size(CAST(:name AS regclass)), "
+                    "pg_indexes_size(CAST(:name AS regclass))"
+                ),
+                params={"name": table},
+            )
+        ).one()
+        sizes[table.strip('"')] = {"table": row[0], "indexes": row[1]}
+    return sizes
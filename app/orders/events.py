@@ -0,0 +1,142 @@
+import asyncio
+import collections
+import json
+import logging
+from typing import AsyncIterator, Deque, Optional, Set
+
+import asyncpg
+
+from app.settings import settings
+
+ORDER_EVENTS_CHANNEL = "order_events"
+# Сколько последних событий держим для догонки по Last-Event-ID
+HISTORY_SIZE = 1000
+# Очередь одного клиента; если он не успевает читать, получит reset
+SUBSCRIBER_QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15
+RECONNECT_SECONDS = 5
+
+log = logging.getLogger(__name__)
+
+RESET_EVENT = {"type": "reset"}
+
+
+def format_sse(event: dict) -> str:
+    if event is RESET_EVENT:
+        # Клиент пропустил события и должен перезагрузить список заявок
+        return "event: reset\ndata: {}\n\n"
+    return f"id: {event['id']}\nevent: order\ndata: {json.dumps(event)}\n\n"
+
+
+class OrderEventBroker:
+    """
+    Одно соединение LISTEN на воркер, события раздаются подключенным
+    клиентам через их собственные очереди.
+    События создает триггер на таблице order (см. миграцию order_events_notify).
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        # В порядке коммитов (доставки NOTIFY), а не по возрастанию id
+        self._history: Deque[dict] = collections.deque(maxlen=HISTORY_SIZE)
+        # События с id не больше этого могли пройти мимо истории: вытеснены
+        # или пришли до подключения LISTEN
+        self._evicted_max = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _listen(self):
+        dsn = settings.POSTGRES_URL.unicode_string().replace("+asyncpg", "")
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(ORDER_EVENTS_CHANNEL, self._on_notify)
+                # Все, что выдано до подключения, в историю уже не попадет
+                self._evicted_max = max(
+                    self._evicted_max,
+                    await connection.fetchval("SELECT last_value FROM order_event_seq"),
+                )
+                # Держим соединение, пока оно живо
+                while not connection.is_closed():
+                    await asyncio.sleep(KEEPALIVE_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Order events listener error: %s", e)
+            finally:
+                if connection and not connection.is_closed():
+                    await connection.close()
+            # За время переподключения события могли потеряться
+            self._publish(RESET_EVENT)
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if len(self._history) == HISTORY_SIZE:
+            self._evicted_max = max(self._evicted_max, self._history[0]["id"])
+        self._history.append(event)
+        self._publish(event)
+
+    def _publish(self, event: dict):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Медленный клиент: выкидываем его очередь и просим перезагрузиться
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESET_EVENT)
+
+    def _replay(self, last_event_id: int) -> list:
+        history = list(self._history)
+        for index, event in enumerate(history):
+            if event["id"] == last_event_id:
+                # Клиент получил все, что было доставлено до этого события;
+                # id тут не сравниваем: транзакции коммитятся не по порядку id
+                return history[index + 1 :]
+        if last_event_id <= self._evicted_max:
+            # Нужные события уже вытеснены из истории или пришли до LISTEN
+            return [RESET_EVENT]
+        return [event for event in history if event["id"] > last_event_id]
+
+    async def subscribe(
+        self, last_event_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        # Уже отправленные при догонке; они же могут лежать и в очереди
+        replayed: Set[int] = set()
+        try:
+            if last_event_id is not None:
+                for event in self._replay(last_event_id):
+                    if event is not RESET_EVENT:
+                        replayed.add(event["id"])
+                    yield format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is not RESET_EVENT and event["id"] in replayed:
+                    replayed.discard(event["id"])
+                    continue
+                yield format_sse(event)
+        finally:
+            self._subscribers.discard(queue)
+
+
+order_events = OrderEventBroker()
@@ -0,0 +1,165 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import AsyncIterator, Literal
+
+import xlsxwriter
+from sqlalchemy import String, cast, func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.db import engine
+from app.orders.filters import OrderFilter
+from app.orders.models import Order, OrderDetail, OrderProductLink
+
+ExportFormat = Literal["csv", "xlsx"]
+
+# Сколько строк забираем из серверного курсора за один раз
+EXPORT_BATCH_SIZE = 1000
+# Размер куска при отдаче готового xlsx файла
+FILE_CHUNK_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = [
+    ("id", "ID заявки"),
+    ("created_at", "Создана"),
+    ("status", "Статус"),
+    ("amount", "Сумма заявки"),
+    ("amount_paid", "Оплачено"),
+    ("delivery_price", "Цена доставки"),
+    ("external_id", "ID у провайдера"),
+    ("first_name", "Имя"),
+    ("email", "Email"),
+    ("phone", "Телефон"),
+    ("address", "Адрес"),
+    ("comment", "Комментарий"),
+    ("products", "Товары"),
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def build_export_query(order_filter: OrderFilter):
+    """Плоский запрос для выгрузки: заявка, детали и товары одной строкой"""
+    # Название берем из снимка в строке заказа, без join с каталогом
+    products = (
+        select(
+            OrderProductLink.order_id,
+            func.string_agg(
+                OrderProductLink.product_name
+                + " x"
+                + cast(OrderProductLink.quantity, String),
+                "; ",
+            ).label("products"),
+        )
+        .group_by(OrderProductLink.order_id)
+        .subquery()
+    )
+    query = (
+        select(
+            Order.id,
+            Order.created_at,
+            Order.status,
+            Order.amount,
+            Order.amount_paid,
+            OrderDetail.delivery_price,
+            Order.external_id,
+            OrderDetail.first_name,
+            OrderDetail.email,
+            OrderDetail.phone,
+            OrderDetail.address,
+            OrderDetail.comment,
+            products.c.products,
+        )
+        .outerjoin(OrderDetail, OrderDetail.order_id == Order.id)
+        .outerjoin(products, products.c.order_id == Order.id)
+    )
+    query = order_filter.filter(query)
+    query = order_filter.sort(query)
+    if not order_filter.order_by:
+        query = query.order_by(Order.created_at)
+    return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+async def _iter_rows(query) -> AsyncIterator[tuple]:
+    # Отдельная сессия: ответ стримится уже после выхода из обработчика
+    async with AsyncSession(engine) as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            for row in partition:
+                yield tuple(row)
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+async def stream_csv(query) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, чтобы Excel корректно открывал кириллицу
+    buffer.write("\ufeff")
+    writer.writerow([title for _, title in EXPORT_COLUMNS])
+    rows = 0
+    async for row in _iter_rows(query):
+        writer.writerow([_csv_value(value) for value in row])
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+async def stream_xlsx(query) -> AsyncIterator[bytes]:
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        # constant_memory: xlsxwriter сбрасывает каждую строку во временный файл
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        worksheet = workbook.add_worksheet("Заявки")
+        datetime_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        worksheet.write_row(0, 0, [title for _, title in EXPORT_COLUMNS])
+        row_num = 0
+        async for row in _iter_rows(query):
+            row_num += 1
+            for col_num, value in enumerate(row):
+                if isinstance(value, datetime):
+                    worksheet.write_datetime(row_num, col_num, value, datetime_format)
+                elif value is None:
+                    continue
+                elif isinstance(value, Enum):
+                    worksheet.write_string(row_num, col_num, value.value)
+                elif isinstance(value, (int, float, Decimal)):
+                    worksheet.write_number(row_num, col_num, value)
+                else:
+                    worksheet.write_string(row_num, col_num, str(value))
+        await run_in_threadpool(workbook.close)
+
+        with open(path, "rb") as file:
+            while chunk := await run_in_threadpool(file.read, FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_orders(
+    order_filter: OrderFilter, format: ExportFormat
+) -> AsyncIterator[bytes]:
+    query = build_export_query(order_filter)
+    if format == "xlsx":
+        return stream_xlsx(query)
+    return stream_csv(query)
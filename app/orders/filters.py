@@ -1,14 +1,19 @@
 from typing import Optional
 from datetime import datetime
+import re
 import uuid
 from typing import List
 
-from sqlalchemy import or_, cast, String
+from sqlalchemy import or_, cast, select, union, Text
 from fastapi_filter.contrib.sqlalchemy import Filter
 
 from app.orders.models import Order, OrderDetail, OrderProductLink, OrderStatus
 
 
+# Строка похожа на телефон: цифры и символы форматирования
+PHONE_CHARS_RE = re.compile(r"[\d\s()+\-]+")
+
+
 class OrderFilter(Filter):
     # Filtering fields
     status: Optional[OrderStatus] = None
@@ -28,9 +33,51 @@ class OrderFilter(Filter):
 
     class Constants(Filter.Constants):
         model = Order
-        # We'll handle nested `detail` fields in the custom filter method below
+        # Search is handled by _search_clause, backed by pg_trgm indexes
         search_model_fields = ["id", "external_id", "detail.email", "detail.phone"]
 
+    @staticmethod
+    def _search_clause(value: str):
+        """
+        Поиск по id, external_id, email и телефону.
+
+        Полный UUID и полный номер телефона ищутся точным совпадением по индексу,
+        остальное - через ILIKE по trigram (pg_trgm) индексам. Каждая ветка
+        поиска идет по своему индексу, результаты объединяются через UNION.
+        """
+        try:
+            return Order.id == uuid.UUID(value)
+        except ValueError:
+            pass
+
+        digits = re.sub(r"\D", "", value)
+        is_phone = PHONE_CHARS_RE.fullmatch(value) is not None
+        if is_phone and len(digits) >= 10:
+            return or_(
+                Order.external_id == value,
+                Order.id.in_(
+                    select(OrderDetail.order_id).where(
+                        OrderDetail.phone_digits == digits[-10:]
+                    )
+                ),
+            )
+
+        pattern = "%{}%".format(
+            value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        branches = [
+            select(Order.id).where(cast(Order.id, Text).ilike(pattern)),
+            select(Order.id).where(Order.external_id.ilike(pattern)),
+            select(OrderDetail.order_id).where(OrderDetail.email.ilike(pattern)),
+        ]
+        if is_phone and len(digits) >= 3:
+            branches.append(
+                select(OrderDetail.order_id).where(
+                    OrderDetail.phone_digits.like(f"%{digits}%")
+                )
+            )
+        return Order.id.in_(union(*branches))
+
     def filter(self, query):
         # Handle product_links.product_id and nested search for detail fields,
         # fall back to parent implementation for other fields.
@@ -45,34 +92,9 @@ class OrderFilter(Filter):
                 )
                 continue
 
-            if (
-                field_name == self.Constants.search_field_name
-                and value
-                and hasattr(self.Constants, "search_model_fields")
-            ):
-                search_filters = []
-                for field in self.Constants.search_model_fields:
-                    if field.startswith("detail."):
-                        # nested detail field
-                        _, detail_field = field.split(".", 1)
-                        search_filters.append(
-                            Order.detail.has(
-                                getattr(OrderDetail, detail_field).ilike(f"%{value}%")
-                            )
-                        )
-                    else:
-                        if field == "id":
-                            search_filters.append(
-                                cast(
-                                    getattr(self.Constants.model, field), String
-                                ).ilike(f"%{value}%")
-                            )
-                        else:
-                            search_filters.append(
-                                getattr(self.Constants.model, field).ilike(f"%{value}%")
-                            )
-
-                query = query.filter(or_(*search_filters))
+            if field_name == self.Constants.search_field_name:
+                if value and value.strip():
+                    query = query.filter(self._search_clause(value.strip()))
                 continue
 
             # Delegate other filters to base implementation by reusing the same logic
@@ -3,7 +3,7 @@ from typing import Optional, Type
 import uuid
 from enum import Enum
 from decimal import Decimal
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Computed, JSON, Numeric, String
 from sqlmodel import Field, Relationship, SQLModel
 
 # from app.orders.schemas import MerchantData
@@ -18,10 +18,35 @@ class OrderStatus(str, Enum):
     SUCCESS = "success"
 
 
+# Статусы, после которых вебхук провайдера заявку уже не меняет
+FINAL_ORDER_STATUSES = (
+    OrderStatus.PAID,
+    OrderStatus.ERROR,
+    OrderStatus.CANCELLED,
+    OrderStatus.SUCCESS,
+)
+
+# Телефон без форматирования: последние 10 цифр (номер без кода страны)
+PHONE_DIGITS_SQL = "right(regexp_replace(phone, '\\D', '', 'g'), 10)"
+
+
 class OrderProductLink(SQLModel, table=True):
     order_id: uuid.UUID = Field(foreign_key="order.id", primary_key=True)
     product_id: uuid.UUID = Field(foreign_key="product.id", primary_key=True)
     quantity: int = Field(title="Количество", gt=0)
+    # Снимок товара на момент заказа: цена и каталог могут поменяться
+    unit_price: Decimal = Field(
+        title="Цена за единицу в рублях",
+        max_digits=12,
+        decimal_places=2,
+        ge=0,
+        default=0,
+    )
+    product_name: str = Field(title="Название товара", default="")
+    weight: Optional[Decimal] = Field(title="Вес товара", default=None)
+    width: Optional[Decimal] = Field(title="Ширина товара, в метрах", default=None)
+    height: Optional[Decimal] = Field(title="Высота товара, в метрах", default=None)
+    length: Optional[Decimal] = Field(title="Длина товара, в метрах", default=None)
 
     order: "Order" = Relationship(back_populates="product_links")
     product: "Product" = Relationship()
@@ -32,6 +57,12 @@ class OrderDetail(SQLModel, table=True):
     order_id: uuid.UUID = Field(foreign_key="order.id", unique=True)
     email: str | None = Field(default=None, index=True)
     phone: str | None = Field(default=None, index=True)
+    phone_digits: str | None = Field(
+        default=None,
+        sa_column=Column(
+            String, Computed(PHONE_DIGITS_SQL, persisted=True), index=True
+        ),
+    )
     first_name: str | None = Field(default=None)
     address: str | None = Field(default=None)
     latitude: str | None = Field(default=None)
@@ -81,10 +112,35 @@ class Order(SQLModel, table=True):
             "passive_deletes": True,
         },
     )
-    external_id: str | None = Field(default=None)
+    external_id: str | None = Field(default=None, index=True)
     payment_data: dict = Field(default_factory=dict, sa_column=Column(JSON))
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
     def get_payment_amount(self) -> Decimal:
         return self.amount + (self.detail.delivery_price if self.detail else Decimal())
+
+
+class ArchivedOrder(SQLModel, table=True):
+    """Компактный индекс заявок, перенесенных в архив (NDJSON.gz на диске)"""
+
+    order_id: uuid.UUID = Field(primary_key=True)
+    file: str = Field(title="Файл архива")
+    status: OrderStatus
+    amount: Decimal = Field(max_digits=12, decimal_places=2, default=0)
+    amount_paid: Decimal = Field(max_digits=12, decimal_places=2, default=0)
+    delivery_price: Optional[Decimal] = Field(
+        default=None, sa_column=Column(Numeric(12, 2), nullable=True)
+    )
+    created_at: datetime = Field(index=True)
+    archived_at: datetime = Field(default_factory=datetime.now)
+
+
+class ArchivedProductSales(SQLModel, table=True):
+    """Продажи товаров по заархивированным строкам заказов, для аналитики"""
+
+    product_id: uuid.UUID = Field(primary_key=True)
+    product_name: str = Field(default="")
+    orders_count: int = Field(default=0)
+    quantity: int = Field(default=0)
+    revenue: Decimal = Field(max_digits=14, decimal_places=2, default=0)
@@ -0,0 +1,27 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+import uuid
+
+from app.products.models import Product
+from app.services.schemas import DeliveryItem
+
+
+def price_cart(
+    products: Iterable[Product], quantities: Dict[uuid.UUID, int]
+) -> Tuple[Decimal, List[DeliveryItem]]:
+    """Сумма корзины по текущим ценам и позиции для расчета доставки"""
+    amount = Decimal()
+    delivery_items = []
+    for product in products:
+        quantity = quantities[product.id]
+        amount += product.rub_price * quantity
+        delivery_items.append(
+            DeliveryItem(
+                quantity=quantity,
+                weight=product.weight,
+                length=product.length,
+                width=product.width,
+                height=product.height,
+            )
+        )
+    return amount, delivery_items
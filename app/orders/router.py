@@ -1,27 +1,32 @@
+import asyncio
 from datetime import datetime
-from decimal import Decimal
+import logging
 import os
-from typing import Annotated, List, Optional
+import time
+from typing import Annotated, List, Optional, Union
 import aiohttp
-from sqlalchemy import or_
 import traceback
 import uuid
 from fastapi import (
     APIRouter,
     Depends,
+    Header,
     Query,
     HTTPException,
     Request,
     UploadFile,
+    WebSocket,
     status,
 )
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert
 from sqlmodel import asc, desc, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, selectinload
 from app.db import get_session
-from app.services.payment_systems.paykeeper import Paykeeper
+from app.services.payment_systems.paykeeper import Paykeeper, paykeeper_tokens
 from app.settings import settings
-from .models import OrderStatus, Product
+from .models import FINAL_ORDER_STATUSES, OrderStatus, Product
 from . import schemas
 from app.auth.dependencies import get_admin_user, get_current_user
 from .models import Order, OrderDetail, OrderProductLink
@@ -29,24 +34,50 @@ from .schemas import (
     DeliveryPrice,
     MerchantData,
     OrderCreate,
+    OrderCreated,
     OrderRead,
+    OrderStatusRead,
     OrderUpdate,
     ProviderOrderInfo,
     RequestForCall,
 )
 from fastapi_filter import FilterDepends
 from app.orders.filters import OrderFilter
+from app.orders.export import MEDIA_TYPES, ExportFormat, export_orders
+from app.orders.events import order_events
+from app.orders.archive import load_archived_order
+from app.orders.pricing import price_cart
+from app.orders.status_channel import (
+    get_order_status,
+    order_status_hub,
+    publish_order_status,
+)
+from app.auth.utils import create_order_status_token, verify_order_status_token
+from app.db import engine
 from fastapi_limiter.depends import RateLimiter
 from app.services.yandex_delivery import get_yandex_delivery_price
-from app.services.schemas import DeliveryItem
 from app.services.logger import logger
+from app.services.metrics import record_outbound
+from app.services.tracing import span
+from app.services.pagination import Page, fetch_page
+from app.services.responses import serialized_response
+from app.services.projection import (
+    parse_fields,
+    projected_model,
+    projection_response,
+    rows_to_dicts,
+)
+from app.services import webhook_inbox
+from app.analytics.refresh import request_refresh
+
+log = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
 @router.post(
     "/",
-    response_model=OrderRead,
+    response_model=OrderCreated,
     status_code=status.HTTP_201_CREATED,
     # dependencies=[Depends(RateLimiter(times=1, seconds=60))],7
 )
@@ -54,34 +85,17 @@ async def create_order(
     order_in: OrderCreate, session: Annotated[AsyncSession, Depends(get_session)]
 ):
     async with session.begin():
+        quantities = {link.product_id: link.quantity for link in order_in.product_links}
         products = (
-            await session.exec(
-                select(Product).where(
-                    Product.id.in_([link.product_id for link in order_in.product_links])
-                )
-            )
+            await session.exec(select(Product).where(Product.id.in_(quantities)))
         ).all()
-        delivery_items = []
-        order_amount = Decimal()
-        for product in products:
-            quantity = next(
-                (
-                    link.quantity
-                    for link in order_in.product_links
-                    if link.product_id == product.id
-                ),
-                1,
-            )
-            order_amount += product.rub_price * quantity
-            delivery_items.append(
-                DeliveryItem(
-                    quantity=quantity,
-                    weight=product.weight,
-                    length=product.length,
-                    width=product.width,
-                    height=product.height,
-                )
+        missing = quantities.keys() - {product.id for product in products}
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Products not found: {', '.join(map(str, missing))}",
             )
+        order_amount, delivery_items = price_cart(products, quantities)
         order = Order(amount=order_amount)
         session.add(order)
         await session.flush()
@@ -91,23 +105,38 @@ async def create_order(
             order_id=order.id,
         )
         if order_in.detail.latitude and order_in.detail.longitude:
-            detail.delivery_price = await get_yandex_delivery_price(
-                delivery_items=delivery_items,
-                latitude=order_in.detail.latitude,
-                longitude=order_in.detail.longitude,
-            )
+            with span("create_order.delivery_price", items=len(delivery_items)):
+                detail.delivery_price = await get_yandex_delivery_price(
+                    delivery_items=delivery_items,
+                    latitude=order_in.detail.latitude,
+                    longitude=order_in.detail.longitude,
+                )
         session.add(detail)
         order.detail = detail
 
-        # Add OrderProductLinks
-        for link in order_in.product_links:
-            opl = OrderProductLink(
-                order_id=order.id, product_id=link.product_id, quantity=link.quantity
+        # Add OrderProductLinks одним INSERT, со снимком цены и товара
+        if products:
+            await session.exec(
+                insert(OrderProductLink),
+                params=[
+                    {
+                        "order_id": order.id,
+                        "product_id": product.id,
+                        "quantity": quantities[product.id],
+                        "unit_price": product.rub_price,
+                        "product_name": product.name,
+                        "weight": product.weight,
+                        "width": product.width,
+                        "height": product.height,
+                        "length": product.length,
+                    }
+                    for product in products
+                ],
             )
-            session.add(opl)
         if order_in.payment_method == "online":
             payment_system = Paykeeper()
-            payment_data = await payment_system.request_deposit(order)
+            with span("create_order.request_deposit", order_id=str(order.id)):
+                payment_data = await payment_system.request_deposit(order)
             if payment_data.success:
                 order.payment_data = (
                     payment_data.serialized_data.merchant_data.model_dump()
@@ -117,7 +146,48 @@ async def create_order(
         await session.commit()
     await session.refresh(order)
     await session.refresh(order, ["product_links", "detail"])
-    return order
+    created = OrderCreated.model_validate(order)
+    created.status_token = create_order_status_token(order.id)
+    return created
+
+
+@router.get("/export", dependencies=[Depends(get_admin_user)])
+async def export_orders_file(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    order_filter: OrderFilter = FilterDepends(OrderFilter),
+    format: ExportFormat = "csv",
+):
+    """Выгрузка всех заявок по фильтру в CSV или XLSX (стримингом)"""
+    # Сессия запроса нужна только для авторизации; выгрузка читает своей,
+    # иначе соединение висело бы занятым до конца стрима
+    await session.close()
+    filename = f"orders_{datetime.now():%Y%m%d_%H%M%S}.{format}"
+    return StreamingResponse(
+        export_orders(order_filter, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/stream", dependencies=[Depends(get_admin_user)])
+async def stream_orders(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    last_event_id: Annotated[Optional[int], Header()] = None,
+):
+    """Живая лента заявок для админки (Server-Sent Events)"""
+    # Сессия нужна только для авторизации, не держим соединение все время стрима
+    await session.close()
+    return StreamingResponse(
+        order_events.subscribe(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/payment_token_metrics", dependencies=[Depends(get_admin_user)])
+async def payment_token_metrics():
+    """Попадания в кеш и обновления токена Paykeeper в этом воркере"""
+    return paykeeper_tokens.metrics()
 
 
 @router.get(
@@ -131,32 +201,76 @@ async def get_order(
         order_id,
         options=[selectinload(Order.product_links), selectinload(Order.detail)],
     )
+    if not order:
+        # Старые завершенные заявки лежат в архиве
+        order = await load_archived_order(session, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 
+ORDER_RELATIONS = {"product_links": Order.product_links, "detail": Order.detail}
+
+
+def _order_projection_query(projection):
+    """Запрос только нужных колонок; связи грузятся, только если их запросили"""
+    columns = [getattr(Order, f) for f in projection if f not in ORDER_RELATIONS]
+    relations = [ORDER_RELATIONS[f] for f in projection if f in ORDER_RELATIONS]
+    if not relations:
+        return select(*columns)
+    return select(Order).options(
+        load_only(*columns), *[selectinload(relation) for relation in relations]
+    )
+
+
 # READ all Orders (anyone)
-@router.get("/", response_model=List[OrderRead], dependencies=[Depends(get_admin_user)])
+@router.get(
+    "/",
+    response_model=Union[List[OrderRead], Page[OrderRead]],
+    dependencies=[Depends(get_admin_user)],
+)
 async def get_orders(
     session: Annotated[AsyncSession, Depends(get_session)],
     order_filter: OrderFilter = FilterDepends(OrderFilter),
     offset: int = 0,
     limit: int = 100,
+    with_total: bool = False,
+    estimate: bool = False,
+    fields: Annotated[
+        Optional[str], Query(description="Поля через запятую, например id,status")
+    ] = None,
 ):
-    query = (
-        select(Order)
-        .options(selectinload(Order.product_links), selectinload(Order.detail))
-        .offset(offset)
-        .limit(limit)
-    )
+    projection = parse_fields(fields, OrderRead.model_fields)
+    if projection:
+        query = _order_projection_query(projection)
+    else:
+        query = select(Order).options(
+            selectinload(Order.product_links), selectinload(Order.detail)
+        )
+    query = query.offset(offset).limit(limit)
 
     # Apply filtering and sorting from OrderFilter
     query = order_filter.filter(query)
     query = order_filter.sort(query)
 
-    result = await session.exec(query)
-    return result.all()
+    orders, total, estimated = await fetch_page(session, query, with_total, estimate)
+    page = None
+    if with_total:
+        page = {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "estimated": estimated,
+        }
+    if projection:
+        if not ORDER_RELATIONS.keys() & set(projection):
+            orders = rows_to_dicts(orders, projection)
+        return projection_response(
+            projected_model(OrderRead, projection), orders, page
+        )
+    if page is None:
+        return serialized_response(List[OrderRead], orders)
+    return serialized_response(Page[OrderRead], {"items": orders, **page})
 
 
 # UPDATE Order (admin only)
@@ -178,6 +292,8 @@ async def update_order(
     session.add(order)
     await session.commit()
     await session.refresh(order, ["product_links", "detail"])
+    if "status" in update_data:
+        await publish_order_status(order)
     return order
 
 
@@ -212,10 +328,11 @@ async def request_for_call(
     session: Annotated[AsyncSession, Depends(get_session)],
 ):
     if settings.TG_BOT_KEY and settings.TG_CHAT_ID:
+        started = time.perf_counter()
         async with aiohttp.ClientSession() as session:
             try:
                 async with session.post(
-                    f"https://api.telegram.org/bot{settings.TG_BOT_KEY}/sendMessage",
+                    f"{settings.TELEGRAM_API_URL}/bot{settings.TG_BOT_KEY}/sendMessage",
                     json={
                         "chat_id": settings.TG_CHAT_ID,
                         "text": f"Новая заявка на звонок от {request_for_call.fio}\nТелефон: `{request_for_call.phone}`\nКомментарий: {request_for_call.comment}",
@@ -223,12 +340,14 @@ async def request_for_call(
                     },
                     headers={"Content-Type": "application/json"},
                 ) as response:
+                    record_outbound("telegram", started, response.status == 200)
                     if response.status != 200:
                         return HTTPException(
                             status_code=500, detail="Failed to send message to Telegram"
                         )
             except Exception as e:
-                print("Error sending Telegram message:", e)
+                record_outbound("telegram", started, False)
+                log.warning("Error sending Telegram message: %s", e)
                 return HTTPException(
                     status_code=500, detail="Failed to send message to Telegram"
                 )
@@ -245,39 +364,18 @@ async def estimate_delivery(
     order_in: OrderCreate,
     session: Annotated[AsyncSession, Depends(get_session)],
 ):
-    delivery_items = []
+    quantities = {link.product_id: link.quantity for link in order_in.product_links}
     products = (
-        await session.exec(
-            select(Product).where(
-                Product.id.in_([link.product_id for link in order_in.product_links])
-            )
-        )
+        await session.exec(select(Product).where(Product.id.in_(quantities)))
     ).all()
-    for product in products:
-        quantity = next(
-            (
-                link.quantity
-                for link in order_in.product_links
-                if link.product_id == product.id
-            ),
-            1,
-        )
-        delivery_items.append(
-            DeliveryItem(
-                quantity=quantity,
-                weight=product.weight,
-                length=product.length,
-                width=product.width,
-                height=product.height,
-            )
-        )
-    return {
-        "delivery_price": await get_yandex_delivery_price(
+    _, delivery_items = price_cart(products, quantities)
+    with span("estimate_delivery.delivery_price", items=len(delivery_items)):
+        delivery_price = await get_yandex_delivery_price(
             delivery_items=delivery_items,
             latitude=order_in.detail.latitude,
             longitude=order_in.detail.longitude,
         )
-    }
+    return {"delivery_price": delivery_price}
 
 
 @router.post(f"/{settings.WEBHOOK_PREFIX}/payment_webhook", include_in_schema=False)
@@ -286,41 +384,65 @@ async def payment_webhook(
     session: Annotated[AsyncSession, Depends(get_session)],
 ):
     response = None
+    event_id = None
     try:
         request_data = await request.json()
         payment_system = Paykeeper()
         if payment_system.check_webhook(request_data):
             callback_data = payment_system.parse_callback_data(request_data)
-            order = (
-                await session.exec(
-                    select(Order).where(
-                        or_(
-                            Order.id == callback_data.order_id,
-                            Order.external_id == callback_data.provider_order_id,
-                        )
-                    )
-                )
-            ).one()
-            if not order:
-                raise HTTPException(status_code=404, detail="Order not found")
-            final_statuses = [
-                OrderStatus.PAID,
-                OrderStatus.ERROR,
-                OrderStatus.CANCELLED,
-            ]
-            if (
-                callback_data.status in final_statuses
-                and order.status not in final_statuses
-            ):
-                order.amount_paid = callback_data.amount_actual
-                order.status = OrderStatus.PAID
-                session.add(order)
-                await session.commit()
-                await session.refresh(order)
-
-            response = payment_system.get_callback_response(
+            callback_response = payment_system.get_callback_response(
                 callback_data.provider_order_id
             )
+
+            # Провайдер может прислать одно событие несколько раз параллельно
+            event_key = payment_system.get_webhook_event_id(request_data)
+            with span("payment_webhook.claim_event", event_id=event_key):
+                event_state = await webhook_inbox.claim_event(event_key)
+            if event_state == webhook_inbox.DONE:
+                return callback_response
+            if event_state == webhook_inbox.PROCESSING:
+                # Ответ без подписи: провайдер повторит доставку позже
+                return "OK"
+            event_id = event_key
+
+            if callback_data.order_id:
+                order_clause = Order.id == callback_data.order_id
+            else:
+                order_clause = Order.external_id == callback_data.provider_order_id
+
+            # Быстрый путь: заявка уже в финальном статусе, блокировка не нужна
+            order_status = (
+                await session.exec(select(Order.status).where(order_clause))
+            ).first()
+            if order_status is None:
+                raise HTTPException(status_code=404, detail="Order not found")
+            if order_status in FINAL_ORDER_STATUSES:
+                await webhook_inbox.complete_event(event_id)
+                return callback_response
+
+            with span("payment_webhook.update_order"):
+                order = (
+                    await session.exec(
+                        select(Order).where(order_clause).with_for_update()
+                    )
+                ).one()
+                # Статус мог поменяться, пока ждали блокировку
+                if (
+                    callback_data.status in FINAL_ORDER_STATUSES
+                    and order.status not in FINAL_ORDER_STATUSES
+                ):
+                    order.amount_paid = callback_data.amount_actual
+                    order.status = OrderStatus.PAID
+                    order.updated_at = datetime.now()
+                    session.add(order)
+                    await session.commit()
+                    request_refresh()
+                    await publish_order_status(order)
+                else:
+                    await session.commit()
+            await webhook_inbox.complete_event(event_id)
+
+            response = callback_response
             await logger.info(
                 f"Заявка № {order.id}\n"
                 + "Вебхук получен\n"
@@ -332,6 +454,8 @@ async def payment_webhook(
                 + f"- Доп. информация: {callback_data.merchant_data.model_dump(exclude_none=True, exclude_unset=True)}"
             )
     except Exception as err:
+        if event_id:
+            await webhook_inbox.release_event(event_id)
         await logger.error(
             f"WEBHOOK ERROR\nHEADERS: {request.headers}\nDATA: {await request.body()}\nERROR: {traceback.format_exc()}"
         )
@@ -339,6 +463,49 @@ async def payment_webhook(
     return response or "OK"
 
 
+@router.get("/{order_id}/status", response_model=OrderStatusRead)
+async def get_order_status_public(
+    order_id: uuid.UUID,
+    token: str,
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    """Статус заявки для покупателя по токену из ответа на создание заявки"""
+    if not verify_order_status_token(token, order_id):
+        raise HTTPException(status_code=403, detail="Invalid order token")
+    order_status = await get_order_status(session, order_id)
+    if not order_status:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order_status
+
+
+@router.websocket("/{order_id}/status")
+async def order_status_ws(websocket: WebSocket, order_id: uuid.UUID, token: str):
+    """Пуш изменений статуса заявки покупателю после перехода на оплату"""
+    if not verify_order_status_token(token, order_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    async def send_updates(queue):
+        async with AsyncSession(engine) as session:
+            current = await get_order_status(session, order_id)
+        while current:
+            await websocket.send_json(current)
+            if OrderStatus(current["status"]) in FINAL_ORDER_STATUSES:
+                break
+            current = await queue.get()
+        await websocket.close()
+
+    # Подписываемся до чтения текущего статуса, чтобы не пропустить изменение
+    async with order_status_hub.subscribe(order_id) as queue:
+        sender = asyncio.create_task(send_updates(queue))
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            sender.cancel()
+
+
 @router.get(
     "/{order_id}/provider_data",
     response_model=ProviderOrderInfo,
@@ -102,7 +102,15 @@ class OrderProductLinkCreate(OrderProductLinkBase):
 
 
 class OrderProductLinkRead(OrderProductLinkBase):
-    pass
+    unit_price: Decimal
+    product_name: str
+    weight: Optional[Decimal] = None
+    width: Optional[Decimal] = None
+    height: Optional[Decimal] = None
+    length: Optional[Decimal] = None
+
+    class Config:
+        from_attributes = True
 
 
 class OrderBase(BaseModel):
@@ -131,6 +139,17 @@ class OrderRead(OrderBase):
         from_attributes = True
 
 
+class OrderCreated(OrderRead):
+    status_token: Optional[str] = Field(
+        description="Токен для получения статуса заявки покупателем", default=None
+    )
+
+
+class OrderStatusRead(BaseModel):
+    status: OrderStatus
+    amount_paid: Decimal
+
+
 class OrderAdminRead(OrderRead):
     external_id: Optional[str]
     amount_paid: Optional[Decimal]
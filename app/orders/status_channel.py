@@ -0,0 +1,108 @@
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import AsyncIterator, Dict, Optional, Set
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.orders.models import Order
+from app.services.redis import redis_client
+
+STATUS_CHANNEL_PREFIX = "order_status:"
+STATUS_CACHE_PREFIX = "order_status_cache:"
+STATUS_CACHE_TTL = 60
+RECONNECT_SECONDS = 5
+
+log = logging.getLogger(__name__)
+
+
+def _status_payload(status, amount_paid) -> dict:
+    return {"status": status.value, "amount_paid": str(amount_paid or 0)}
+
+
+async def get_order_status(
+    session: AsyncSession, order_id: uuid.UUID
+) -> Optional[dict]:
+    """Статус и оплаченная сумма заявки, без загрузки связей, с кэшем в Redis"""
+    cached = await redis_client.get(f"{STATUS_CACHE_PREFIX}{order_id}")
+    if cached:
+        return json.loads(cached)
+    row = (
+        await session.exec(
+            select(Order.status, Order.amount_paid).where(Order.id == order_id)
+        )
+    ).first()
+    if not row:
+        return None
+    payload = _status_payload(*row)
+    await redis_client.set(
+        f"{STATUS_CACHE_PREFIX}{order_id}", json.dumps(payload), ex=STATUS_CACHE_TTL
+    )
+    return payload
+
+
+async def publish_order_status(order: Order):
+    """Обновить кэш и разослать статус всем воркерам через Redis pub/sub"""
+    payload = json.dumps(_status_payload(order.status, order.amount_paid))
+    await redis_client.set(
+        f"{STATUS_CACHE_PREFIX}{order.id}", payload, ex=STATUS_CACHE_TTL
+    )
+    await redis_client.publish(f"{STATUS_CHANNEL_PREFIX}{order.id}", payload)
+
+
+class OrderStatusHub:
+    """
+    Одна подписка на Redis (psubscribe order_status:*) на воркер,
+    сообщения раздаются открытым веб-сокетам этой заявки.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _listen(self):
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{STATUS_CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    order_id = message["channel"][len(STATUS_CHANNEL_PREFIX) :]
+                    for queue in self._subscribers.get(order_id, ()):
+                        queue.put_nowait(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Order status listener error: %s", e)
+            finally:
+                with contextlib.suppress(Exception):
+                    await pubsub.close()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, order_id: uuid.UUID) -> AsyncIterator[asyncio.Queue]:
+        key = str(order_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[key].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[key].discard(queue)
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+
+
+order_status_hub = OrderStatusHub()
@@ -1,6 +1,6 @@
 from datetime import datetime
 import os
-from typing import Annotated, List, Literal, Optional
+from typing import Annotated, List, Literal, Optional, Union
 import uuid
 from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, status
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -8,6 +8,14 @@ from sqlmodel import asc, desc, select
 from app.auth.dependencies import get_admin_user, get_current_user
 from app.auth.utils import download_file, remove_file
 from app.db import get_session
+from app.services.pagination import Page, fetch_page
+from app.services.responses import serialized_response
+from app.services.projection import (
+    parse_fields,
+    projected_model,
+    projection_response,
+    rows_to_dicts,
+)
 from app.settings import settings
 from app.users.models import User
 from .models import Product
@@ -94,7 +102,7 @@ async def delete_product(
     return None
 
 
-@router.get("/", response_model=List[Product])
+@router.get("/", response_model=Union[List[Product], Page[Product]])
 async def read_list_product(
     session: Annotated[AsyncSession, Depends(get_session)],
     client: Annotated[Optional[User], Depends(get_current_user)],
@@ -104,8 +112,17 @@ async def read_list_product(
     limit: Annotated[int, Query()] = 100,
     sort_by: Optional[Literal["id", "name", "rub_price", "created_at"]] = "id",
     order: Optional[Literal["asc", "desc"]] = "desc",
+    with_total: bool = False,
+    estimate: bool = False,
+    fields: Annotated[
+        Optional[str], Query(description="Поля через запятую, например name,rub_price")
+    ] = None,
 ):
-    query = select(Product)
+    projection = parse_fields(fields, Product.model_fields)
+    if projection:
+        query = select(*[getattr(Product, field) for field in projection])
+    else:
+        query = select(Product)
     if not client or client.role != "admin":
         query = query.where(Product.is_active)
     if category_id:
@@ -114,12 +131,27 @@ async def read_list_product(
         query = query.where(Product.is_main == is_main)
     query = query.offset(offset).limit(limit)
     if order == "asc":
-        query = query.order_by(asc(sort_by))
+        query = query.order_by(asc(getattr(Product, sort_by)))
     else:
-        query = query.order_by(desc(sort_by))
-    results = await session.exec(query)
-
-    return results.all()
+        query = query.order_by(desc(getattr(Product, sort_by)))
+    products, total, estimated = await fetch_page(session, query, with_total, estimate)
+    page = None
+    if with_total:
+        page = {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "estimated": estimated,
+        }
+    if projection:
+        return projection_response(
+            projected_model(Product, projection),
+            rows_to_dicts(products, projection),
+            page,
+        )
+    if page is None:
+        return serialized_response(List[Product], products)
+    return serialized_response(Page[Product], {"items": products, **page})
 
 
 @router.post("/add-image/{id}", dependencies=[Depends(get_admin_user)])
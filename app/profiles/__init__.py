@@ -0,0 +1 @@
+# Profiles module
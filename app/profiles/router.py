@@ -0,0 +1,29 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from app.auth.dependencies import get_admin_user
+from app.services.profiling import list_profiles, profile_path
+from .schemas import ProfileInfo
+
+router = APIRouter(
+    prefix="/profiles",
+    tags=["profiles"],
+    dependencies=[Depends(get_admin_user)],
+)
+
+
+@router.get("", response_model=List[ProfileInfo])
+async def get_profiles():
+    """Сохраненные профили запросов, новые первыми"""
+    return list_profiles()
+
+
+@router.get("/{name}")
+async def download_profile(name: str):
+    """Профиль запроса (HTML с деревом вызовов)"""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return FileResponse(path, media_type="text/html", filename=name)
@@ -1,51 +1,184 @@
+import asyncio
+import contextlib
+import time
+from collections import Counter
+from typing import List, Optional
+
 import aiohttp
+from app.services.metrics import record_outbound
 from app.settings import settings
 
 import logging
 
 default_logger = logging.getLogger(__name__)
 
+MESSAGE_LIMIT = 4096
+BATCH_SEPARATOR = "\n\n"
+# В группу Telegram пускает не больше 20 сообщений в минуту
+MIN_SEND_INTERVAL = 3
+MAX_ATTEMPTS = 5
+FLUSH_TIMEOUT = 10
+
 
 class TgLogger:
+    """
+    Логи в Telegram через ограниченную очередь и фоновую отправку.
+    Вызывающий код не ждет Telegram: сообщение кладется в очередь, а фоновая
+    задача склеивает их в пачки до 4096 символов и шлет с учетом лимитов.
+    """
+
     BOT_TOKEN = settings.TG_LOG_BOT_KEY
     CHAT_ID = settings.TG_LOG_CHAT_ID
 
-    async def _request(self, message: str):
-        if self.BOT_TOKEN and self.CHAT_ID:
+    def __init__(self, maxsize: int = settings.TG_LOG_QUEUE_SIZE):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pending: Optional[str] = None
+        self._stopping = False
+        self.counters = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.BOT_TOKEN and self.CHAT_ID)
+
+    def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дослать очередь при остановке, но не дольше FLUSH_TIMEOUT"""
+        if not self._task:
+            return
+        self._stopping = True
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.counters["dropped"] += 1
+        self._queue.put_nowait(None)
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.shield(self._task), FLUSH_TIMEOUT)
+        self._task.cancel()
+        self._task = None
+
+    async def _request(
+        self, session: aiohttp.ClientSession, text: str, markdown: bool = True
+    ) -> Optional[float]:
+        """Отправка одного сообщения; возвращает паузу перед повтором или None"""
+        payload = {"chat_id": self.CHAT_ID, "text": text[:MESSAGE_LIMIT]}
+        if markdown:
+            payload["parse_mode"] = "MarkDown"
+        started = time.perf_counter()
+        try:
+            async with session.post(
+                f"{settings.TELEGRAM_API_URL}/bot{self.BOT_TOKEN}/sendMessage",
+                json=payload,
+                headers={"Content-Type": "application/json"},
+            ) as response:
+                status = response.status
+                data = None if status == 200 else await response.json(content_type=None)
+        except Exception:
+            record_outbound("telegram", started, False)
+            raise
+        record_outbound("telegram", started, status == 200)
+
+        if status == 200:
+            return None
+        if status == 429:
+            self.counters["rate_limited"] += 1
+            return float(data.get("parameters", {}).get("retry_after", 5))
+        if status == 400 and markdown:
+            # Обрезанная разметка: шлем тем же текстом, но без Markdown
+            return await self._request(session, text, markdown=False)
+        default_logger.warning(
+            "Error sending Telegram message status: %s",
+            status,
+            extra={"response": data},
+        )
+        return 2.0
+
+    async def _send(self, text: str):
+        self._session = self._session or aiohttp.ClientSession()
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                delay = await self._request(self._session, text)
+            except Exception as e:
+                default_logger.warning("Error sending Telegram message: %s", e)
+                delay = 2.0 * 2**attempt
+            if delay is None:
+                self.counters["sent"] += 1
+                return
+            await asyncio.sleep(delay)
+        self.counters["failed"] += 1
+
+    def _next_batch(self, first: str) -> List[str]:
+        batch = [first]
+        size = len(first)
+        while not self._queue.empty():
+            message = self._queue.get_nowait()
+            if message is None:
+                # Признак остановки вернем в очередь, дослав текущее
+                self._queue.put_nowait(None)
+                break
+            if size + len(BATCH_SEPARATOR) + len(message) > MESSAGE_LIMIT:
+                self._pending = message
+                break
+            batch.append(message)
+            size += len(BATCH_SEPARATOR) + len(message)
+        return batch
+
+    async def _run(self):
+        try:
+            last_sent = 0.0
+            while True:
+                message, self._pending = self._pending, None
+                if message is None:
+                    message = await self._queue.get()
+                if message is None:
+                    return
+                wait = MIN_SEND_INTERVAL - (time.monotonic() - last_sent)
+                if wait > 0:
+                    # Пока ждем лимит, в очереди копятся сообщения для пачки
+                    await asyncio.sleep(wait)
+                batch = self._next_batch(message)
+                self.counters["messages"] += len(batch)
+                await self._send(BATCH_SEPARATOR.join(batch))
+                last_sent = time.monotonic()
+        finally:
+            if self._session:
+                await self._session.close()
+                self._session = None
+
+    async def _enqueue(self, level: str, message: str):
+        text = f"{level}\n{message}"[:MESSAGE_LIMIT]
+        if not self.enabled:
+            return
+        if not self._task or self._stopping:
+            # Фоновой отправки нет (скрипты): шлем сразу, как раньше
             async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.post(
-                        f"https://api.telegram.org/bot{self.BOT_TOKEN}/sendMessage",
-                        json={
-                            "chat_id": self.CHAT_ID,
-                            "text": message[:4096],
-                            "parse_mode": "MarkDown",
-                        },
-                        headers={"Content-Type": "application/json"},
-                    ) as response:
-                        if response.status != 200:
-                            print(
-                                "Error sending Telegram message status:",
-                                response.status,
-                                await response.json(),
-                            )
-                except Exception as e:
-                    print("Error sending Telegram message:", e)
+                with contextlib.suppress(Exception):
+                    await self._request(session, text)
+            return
+        if self._queue.full():
+            if level == "INFO":
+                self.counters["dropped"] += 1
+                return
+            # Ошибки важнее: освобождаем место за счет самого старого сообщения
+            with contextlib.suppress(asyncio.QueueEmpty):
+                self._queue.get_nowait()
+                self.counters["dropped"] += 1
+        self._queue.put_nowait(text)
 
     async def info(self, message: str):
-        print(message)
-        # default_logger.info(message)
-        await self._request("INFO\n" + message)
+        default_logger.info(message)
+        await self._enqueue("INFO", message)
 
     async def warning(self, message: str):
-        print(message)
-        # default_logger.warning(message)
-        await self._request("WARNING\n" + message)
+        default_logger.warning(message)
+        await self._enqueue("WARNING", message)
 
     async def error(self, message: str):
-        print(message)
-        # default_logger.error(message)
-        await self._request("ERROR\n" + message)
+        default_logger.error(message)
+        await self._enqueue("ERROR", message)
 
 
 logger = TgLogger()
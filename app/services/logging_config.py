@@ -0,0 +1,161 @@
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+import orjson
+
+from app.settings import settings
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "x-request-id"
+# Стандартные атрибуты LogRecord; все остальное пришло через extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись; поля из extra= попадают в корень"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            data["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return orjson.dumps(data, default=str).decode()
+
+
+class ContextFilter(logging.Filter):
+    """Берет correlation id из контекста запроса в момент записи"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Сэмплирование записей ниже WARNING по модулям: LOG_SAMPLING задает долю
+    записей, которая проходит, для логгера и всех его потомков.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        return random.random() < self._rate(record.name)
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    На пути запроса только подстановка аргументов и постановка в очередь;
+    JSON и запись в stdout делает поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Трейсбек форматируем сразу, чтобы не держать ссылки на фреймы
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """Корневой логгер пишет JSON в stdout через очередь и отдельный поток"""
+    global _listener
+    if _listener:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    handler = LogQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLING))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, output, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def stop_logging():
+    """Дописать очередь перед остановкой процесса"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    Correlation id запроса: из заголовка X-Request-ID или новый. Кладется
+    в contextvar для логов и возвращается в заголовке ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [
+                    *message["headers"],
+                    (REQUEST_ID_HEADER.encode(), request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,191 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from fastapi_limiter import http_default_callback
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.services import tracing
+from app.services.server_timing import add_timing
+
+# Несколько воркеров uvicorn: каждый пишет свои значения в файлы в
+# PROMETHEUS_MULTIPROC_DIR, а /metrics суммирует их при сборе
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Запросы в обработке",
+    multiprocess_mode="livesum",
+)
+DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Суммарное время запросов к базе за один HTTP запрос",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Соединения, взятые из пула",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Размер пула соединений",
+    multiprocess_mode="livesum",
+)
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds",
+    "Время запросов во внешние сервисы",
+    ["service"],
+)
+OUTBOUND_ERRORS = Counter(
+    "outbound_request_errors_total",
+    "Неудачные запросы во внешние сервисы",
+    ["service"],
+)
+RATE_LIMITED = Counter(
+    "rate_limit_rejections_total",
+    "Запросы, отклоненные FastAPILimiter",
+    ["route"],
+)
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds",
+    "Время команд Redis",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+
+_db_time: ContextVar[Optional[list]] = ContextVar("db_time", default=None)
+
+
+def record_outbound(service: str, started: float, success: bool):
+    """Учесть запрос во внешний сервис; started - time.perf_counter() до запроса"""
+    elapsed = time.perf_counter() - started
+    OUTBOUND_LATENCY.labels(service).observe(elapsed)
+    add_timing("http", elapsed)
+    if not success:
+        OUTBOUND_ERRORS.labels(service).inc()
+    tracing.record_span(
+        f"http {service}",
+        started,
+        error=None if success else "request failed",
+        **{"peer.service": service},
+    )
+
+
+def instrument_engine(engine):
+    """Время запросов к базе по HTTP запросам и занятость пула"""
+    sync_engine = engine.sync_engine
+    DB_POOL_SIZE.set(sync_engine.pool.size())
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def finish_query(conn):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        add_timing("db", elapsed)
+        total = _db_time.get()
+        if total is not None:
+            total[0] += elapsed
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        finish_query(conn)
+
+    # Упавший запрос after_cursor_execute не получает: иначе время начала
+    # остается в стеке соединения и сдвигает замеры следующих запросов
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            finish_query(connection)
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def checkout(dbapi_connection, record, proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def checkin(dbapi_connection, record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+class MetricsMiddleware:
+    """Латентность по шаблону маршрута и статусу, запросы в обработке, время БД"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        db_time = [0.0]
+        token = _db_time.set(db_time)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _db_time.reset(token)
+            # Шаблон вида /api/orders/{order_id}, а не сам путь: метки не растут
+            route = scope.get("route")
+            template = route.path if route is not None else "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], template, status).observe(
+                time.perf_counter() - started
+            )
+            DB_TIME.labels(template).observe(db_time[0])
+
+
+async def rate_limit_callback(request: Request, response: Response, pexpire: int):
+    """http_callback для FastAPILimiter: считаем отказ и отвечаем как обычно"""
+    route = request.scope.get("route")
+    RATE_LIMITED.labels(route.path if route is not None else "unmatched").inc()
+    return await http_default_callback(request, response, pexpire)
+
+
+def mark_process_dead():
+    """Остановка воркера: его live-гейджи больше не учитываются"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def metrics_response(request: Request) -> Response:
+    # Снаружи /metrics не отдаем: nginx проставляет X-Real-IP, сборщик метрик
+    # ходит в контейнер напрямую
+    if request.headers.get("x-real-ip"):
+        return Response(status_code=404)
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(
+            generate_latest(registry), headers={"Content-Type": CONTENT_TYPE_LATEST}
+        )
+    # Не media_type: starlette дописал бы к нему второй charset
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
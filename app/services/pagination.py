@@ -0,0 +1,74 @@
+from typing import Any, Generic, List, Optional, Tuple, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import func, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+ItemT = TypeVar("ItemT")
+
+
+class Page(BaseModel, Generic[ItemT]):
+    """Страница списка с общим количеством записей"""
+
+    items: List[ItemT]
+    total: int
+    offset: int
+    limit: int
+    estimated: bool = False
+
+
+async def estimate_count(session: AsyncSession, table_name: str) -> Optional[int]:
+    """Оценка количества строк по статистике планировщика (pg_class.reltuples)"""
+    reltuples = (
+        await session.exec(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            params={"name": f'"{table_name}"'},
+        )
+    ).scalar()
+    # -1 означает, что таблицу еще ни разу не анализировали
+    if reltuples is None or reltuples < 0:
+        return None
+    return reltuples
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query,
+    with_total: bool = False,
+    estimate: bool = False,
+) -> Tuple[List[Any], Optional[int], bool]:
+    """
+    Выполнение запроса списка с подсчетом общего количества.
+
+    Для запросов с фильтрами total считается оконной функцией в том же запросе.
+    estimate=True для запроса без фильтров берет оценку из pg_class.
+    Возвращает (items, total, estimated).
+    """
+    if not with_total:
+        return (await session.exec(query)).all(), None, False
+
+    if estimate and query.whereclause is None:
+        table_name = query.get_final_froms()[0].name
+        total = await estimate_count(session, table_name)
+        if total is not None:
+            return (await session.exec(query)).all(), total, True
+
+    counted = query.add_columns(func.count().over().label("total"))
+    # session.exec на select(Model) вернул бы только первую колонку
+    rows = (await session.execute(counted)).all()
+    if rows:
+        if len(query.column_descriptions) == 1:
+            items = [row[0] for row in rows]
+        else:
+            items = [tuple(row[:-1]) for row in rows]
+        return items, rows[0][-1], False
+
+    # Пустая страница (offset за концом списка): считаем отдельно
+    total = (
+        await session.exec(
+            select(func.count()).select_from(
+                query.limit(None).offset(None).order_by(None).subquery()
+            )
+        )
+    ).scalar()
+    return [], total, False
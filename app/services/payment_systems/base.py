@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import time
 from decimal import Decimal
 from typing import Awaitable, List, Literal, Optional, Type
 
@@ -7,6 +8,7 @@ import aiohttp
 from app.orders.models import Order
 from app.orders.schemas import ProviderOrderInfo, SerializedResponse
 from app.services.logger import logger
+from app.services.metrics import record_outbound
 
 
 class ProviderClientBase(ABC):
@@ -21,6 +23,11 @@ class ProviderClientBase(ABC):
         "This method is used when receiving callback from merchant"
         raise NotImplementedError("Webhook is not supported for this provider.")
 
+    @classmethod
+    def get_webhook_event_id(cls, request_data: dict) -> str:
+        "Уникальный идентификатор события вебхука для дедупликации"
+        raise NotImplementedError("Webhook is not supported for this provider.")
+
     @abstractmethod
     async def get_order_info(
         self, order: Order
@@ -54,6 +61,7 @@ class ProviderClientBase(ABC):
         result_data = {}
         error = ""
         response = None
+        started = time.perf_counter()
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.request(
@@ -72,6 +80,7 @@ class ProviderClientBase(ABC):
         except Exception as err:
             error = f"Ошибка: {err}"
             success = False
+        record_outbound(self.__class__.__name__.lower(), started, success)
         if log:
             await logger.info(
                 (f"Заявка № {order_id}\n" if order_id else "")
@@ -1,5 +1,5 @@
 from decimal import Decimal
-from typing import Awaitable, Type
+from typing import Awaitable, Optional, Type
 import base64
 import hashlib
 
@@ -7,11 +7,11 @@ from app.settings import settings
 from app.orders.models import Order, OrderStatus
 from app.orders.schemas import MerchantData, ProviderOrderInfo, SerializedResponse
 from app.services.payment_systems.base import ProviderClientBase
-from app.services.redis import redis_client
+from app.services.payment_systems.token_manager import TokenManager
 
 
 class Paykeeper(ProviderClientBase):
-    URL = "https://237200454513.server.paykeeper.ru/"
+    URL = settings.PAYKEEPER_URL
     USER = settings.PAYKEEPER_USER
     PASSWORD = settings.PAYKEEPER_PASSWORD
     SECRET = settings.PAYKEEPER_SECRET
@@ -22,6 +22,34 @@ class Paykeeper(ProviderClientBase):
         "expired": OrderStatus.ERROR,
     }
 
+    def _headers(self) -> dict:
+        basic_auth = base64.b64encode(f"{self.USER}:{self.PASSWORD}".encode()).decode()
+        return {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": f"Basic {basic_auth}",
+        }
+
+    async def _fetch_token(self) -> Optional[str]:
+        response = await self._request(
+            f"{self.URL}info/settings/token/",
+            "GET",
+            headers=self._headers(),
+            log=False,
+        )
+        return self._get_param(response.raw_data, "token")
+
+    @classmethod
+    def _is_auth_failure(cls, response: SerializedResponse) -> bool:
+        "Paykeeper отвечает на протухший токен 200 с result=fail и текстом про токен"
+        if response.status_code in (401, 403):
+            return True
+        if not isinstance(response.raw_data, dict):
+            return False
+        message = str(cls._get_param(response.raw_data, "msg") or "").lower()
+        return cls._get_param(response.raw_data, "result") == "fail" and (
+            "token" in message or "токен" in message
+        )
+
     async def _make_request(
         self,
         resource,
@@ -31,26 +59,21 @@ class Paykeeper(ProviderClientBase):
         order_id=None,
     ) -> SerializedResponse:
         url = f"{self.URL}{resource}"
-        basic_auth = base64.b64encode(f"{self.USER}:{self.PASSWORD}".encode()).decode()
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": f"Basic {basic_auth}",
-        }
-        if method == "POST":
-            token = await redis_client.get("paykeeper_token")
-            if not token:
-                response = await self._request(
-                    f"{self.URL}info/settings/token/",
-                    "GET",
-                    headers=headers,
-                    log=False,
-                )
-                token = self._get_param(response.raw_data, "token")
-                if token:
-                    await redis_client.set("paykeeper_token", token, 12 * 60 * 60)
-            if data:
-                data["token"] = token
-        return await self._request(
+        headers = self._headers()
+        if method != "POST":
+            return await self._request(
+                url=url,
+                method=method,
+                headers=headers,
+                data=data,
+                params=params,
+                order_id=order_id,
+            )
+
+        token = await paykeeper_tokens.get_token()
+        if data:
+            data["token"] = token
+        response = await self._request(
             url=url,
             method=method,
             headers=headers,
@@ -58,6 +81,21 @@ class Paykeeper(ProviderClientBase):
             params=params,
             order_id=order_id,
         )
+        if token and self._is_auth_failure(response):
+            # Токен отозван раньше срока: берем новый и повторяем один раз
+            await paykeeper_tokens.invalidate(token)
+            token = await paykeeper_tokens.get_token(stale=token)
+            if data:
+                data["token"] = token
+            response = await self._request(
+                url=url,
+                method=method,
+                headers=headers,
+                data=data,
+                params=params,
+                order_id=order_id,
+            )
+        return response
 
     async def request_deposit(
         self, order: Type[Order]
@@ -100,6 +138,11 @@ class Paykeeper(ProviderClientBase):
             amount_actual=Decimal(cls._get_param(request_data, "sum")),
         )
 
+    @classmethod
+    def get_webhook_event_id(cls, request_data: dict) -> str:
+        "Paykeeper присылает id платежа, повторные доставки приходят с тем же id"
+        return f"paykeeper:{cls._get_param(request_data, 'id')}"
+
     async def get_order_info(
         self, order: Order
     ) -> SerializedResponse[ProviderOrderInfo]:
@@ -138,3 +181,11 @@ class Paykeeper(ProviderClientBase):
     def get_callback_response(self, provider_order_id: str) -> str:
         sign = hashlib.md5((provider_order_id + self.SECRET).encode()).hexdigest()
         return f"OK {sign}"
+
+
+paykeeper_tokens = TokenManager(
+    "paykeeper",
+    fetch=lambda: Paykeeper()._fetch_token(),
+    ttl=settings.PAYKEEPER_TOKEN_TTL,
+    refresh_before=settings.PAYKEEPER_TOKEN_REFRESH_BEFORE,
+)
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import uuid
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+from app.services.redis import RELEASE_LOCK_SCRIPT, redis_client
+
+# Время жизни блокировки и сколько ждем, пока другой воркер получит токен.
+# Больше таймаута запроса к провайдеру (20 с), иначе блокировка истечет
+# посреди запроса и за токеном пойдет второй воркер
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.1
+
+
+class TokenManager:
+    """
+    Токен платежной системы с общим кешем в Redis и копией в памяти процесса.
+
+    Токен обновляется заранее, за refresh_before секунд до истечения, в фоне.
+    Запрос к провайдеру делает только один воркер (блокировка в Redis) и одна
+    корутина внутри процесса, остальные ждут готовый токен.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[Optional[str]]],
+        ttl: int,
+        refresh_before: int,
+    ):
+        self.key = f"{name}_token"
+        self.lock_key = f"{name}_token_lock"
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_before = refresh_before
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._background: Optional[asyncio.Task] = None
+        self.counters = Counter()
+
+    def _remaining(self) -> float:
+        return self._expires_at - time.time()
+
+    def _store_local(self, token: str, ttl: float):
+        self._token = token
+        self._expires_at = time.time() + ttl
+
+    async def _load_shared(self) -> tuple[Optional[str], int]:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            token, ttl = await pipe.get(self.key).ttl(self.key).execute()
+        return token, ttl
+
+    async def get_token(self, stale: Optional[str] = None) -> Optional[str]:
+        """
+        Действующий токен. stale - токен, который провайдер только что отверг,
+        его повторно не возвращаем.
+        """
+        remaining = self._remaining()
+        if self._token and self._token != stale and remaining > 0:
+            self.counters["local_hits"] += 1
+            if remaining < self.refresh_before and (
+                self._background is None or self._background.done()
+            ):
+                self._background = asyncio.create_task(self._refresh(None))
+            return self._token
+        self.counters["local_misses"] += 1
+        return await self._refresh(stale)
+
+    async def _refresh(self, stale: Optional[str]) -> Optional[str]:
+        async with self._lock:
+            # Пока ждали блокировку, токен могла обновить другая корутина
+            if (
+                self._token
+                and self._token != stale
+                and self._remaining() > self.refresh_before
+            ):
+                return self._token
+
+            token, ttl = await self._load_shared()
+            if token and token != stale and ttl > self.refresh_before:
+                self.counters["redis_hits"] += 1
+                self._store_local(token, ttl)
+                return token
+
+            lock_token = uuid.uuid4().hex
+            if await redis_client.set(
+                self.lock_key, lock_token, nx=True, ex=LOCK_TIMEOUT
+            ):
+                try:
+                    return await self._fetch(stale)
+                finally:
+                    await redis_client.eval(
+                        RELEASE_LOCK_SCRIPT, 1, self.lock_key, lock_token
+                    )
+
+            self.counters["lock_waits"] += 1
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                token, ttl = await self._load_shared()
+                if token and token != stale and ttl > self.refresh_before:
+                    self._store_local(token, ttl)
+                    return token
+            # Воркер с блокировкой не справился: старый токен еще жив или идем сами
+            if self._token and self._token != stale and self._remaining() > 0:
+                return self._token
+            return await self._fetch(stale)
+
+    async def _fetch(self, stale: Optional[str]) -> Optional[str]:
+        self.counters["refreshes"] += 1
+        try:
+            token = await self.fetch()
+        except Exception:
+            token = None
+        if not token:
+            self.counters["refresh_failures"] += 1
+            if self._token and self._token != stale and self._remaining() > 0:
+                return self._token
+            return None
+        await redis_client.set(self.key, token, self.ttl)
+        self._store_local(token, self.ttl)
+        return token
+
+    async def invalidate(self, token: str):
+        """Провайдер отверг токен: убираем его из памяти и из Redis"""
+        self.counters["auth_failures"] += 1
+        if self._token == token:
+            self._token = None
+            self._expires_at = 0.0
+        if await redis_client.get(self.key) == token:
+            await redis_client.delete(self.key)
+
+    def metrics(self) -> dict:
+        calls = self.counters["local_hits"] + self.counters["local_misses"]
+        return {
+            **self.counters,
+            "hit_rate": (
+                round(self.counters["local_hits"] / calls, 4) if calls else None
+            ),
+            "expires_in": max(int(self._remaining()), 0) if self._token else 0,
+        }
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from pyinstrument import Profiler
+
+from app.auth.utils import is_admin_scope
+from app.services.logging_config import request_id_var
+from app.services.redis import redis_client
+from app.services.responses import FastJSONResponse
+from app.settings import settings
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "profile"
+PROFILE_FILE_HEADER = b"x-profile-file"
+# Один профиль на все воркеры раз в PROFILE_MIN_INTERVAL секунд
+RATE_LIMIT_KEY = "profile_rate_limit"
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.html$")
+
+# Профайлер в процессе один: сэмплирование общее на поток, а второй
+# Profiler.start() в том же async контексте бросает RuntimeError
+_profiling = False
+
+
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value not in (b"", b"0")
+    query = scope["query_string"]
+    if PROFILE_QUERY.encode() not in query:
+        return False
+    values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY)
+    return bool(values) and values[0] not in ("", "0")
+
+
+def _profile_name(scope) -> str:
+    path = re.sub(r"[^\w-]+", "-", scope["path"]).strip("-") or "root"
+    request_id = re.sub(r"[^\w-]", "", request_id_var.get() or "")[:32]
+    return (
+        f"{time.strftime('%Y%m%d-%H%M%S')}_{scope['method']}_{path[:80]}"
+        f"_{request_id or os.urandom(4).hex()}.html"
+    )
+
+
+def _save(profiler: Profiler, name: str):
+    os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILES_DIR, name), "w", encoding="utf-8") as f:
+        f.write(profiler.output_html())
+    # Старые профили удаляем, чтобы каталог не рос без ограничений
+    for old in list_profiles()[settings.PROFILES_KEEP :]:
+        try:
+            os.remove(os.path.join(settings.PROFILES_DIR, old["name"]))
+        except OSError:
+            pass
+
+
+def list_profiles() -> List[dict]:
+    """Сохраненные профили, новые первыми"""
+    try:
+        entries = [
+            entry
+            for entry in os.scandir(settings.PROFILES_DIR)
+            if entry.is_file() and PROFILE_NAME_RE.match(entry.name)
+        ]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        stat = entry.stat()
+        profiles.append(
+            {
+                "name": entry.name,
+                "size": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime),
+            }
+        )
+    profiles.sort(key=lambda profile: profile["created_at"], reverse=True)
+    return profiles
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Путь к профилю по имени; None, если имя недопустимо или файла нет"""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    path = os.path.join(settings.PROFILES_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запроса по требованию: заголовок X-Profile: 1 или ?profile=1
+    с токеном админа. Запрос выполняется под сэмплирующим профайлером
+    (pyinstrument), дерево вызовов сохраняется в PROFILES_DIR, имя файла
+    возвращается в заголовке X-Profile-File. Пока в процессе пишется профиль,
+    следующие такие запросы выполняются без профайлера. Остальные запросы
+    только проверяют заголовок и query string.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not _requested(scope)
+            or not is_admin_scope(scope)
+        ):
+            return await self.app(scope, receive, send)
+
+        global _profiling
+        if _profiling:
+            log.info("Profiler busy in this process, request runs unprofiled")
+            return await self.app(scope, receive, send)
+        # Флаг ставим до первого await, чтобы соседний запрос его увидел
+        _profiling = True
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _profiling = False
+
+    async def _profile(self, scope, receive, send):
+        interval = settings.PROFILE_MIN_INTERVAL
+        if not await redis_client.set(RATE_LIMIT_KEY, 1, nx=True, ex=interval):
+            retry_after = await redis_client.ttl(RATE_LIMIT_KEY)
+            response = FastJSONResponse(
+                {"detail": "Profiling rate limit exceeded"},
+                status_code=429,
+                headers={"Retry-After": str(max(retry_after, 1))},
+            )
+            return await response(scope, receive, send)
+
+        name = _profile_name(scope)
+
+        async def send_with_name(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_FILE_HEADER, name.encode()),
+                ]
+            await send(message)
+
+        profiler = Profiler(
+            interval=settings.PROFILE_SAMPLE_INTERVAL, async_mode="enabled"
+        )
+        try:
+            profiler.start()
+        except RuntimeError as e:
+            log.warning("Profiler start error: %s", e)
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            profiler.stop()
+            try:
+                # HTML рендерится заметное время: не в event loop
+                await asyncio.to_thread(_save, profiler, name)
+            except Exception as e:
+                log.warning("Profile save error: %s", e)
+            else:
+                log.info("Profile saved", extra={"profile": name})
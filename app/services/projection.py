@@ -0,0 +1,52 @@
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, ConfigDict, create_model
+
+from app.services.pagination import Page
+from app.services.responses import serialized_response
+
+
+def parse_fields(
+    fields: Optional[str], allowed: Iterable[str]
+) -> Optional[Tuple[str, ...]]:
+    """Разбор параметра fields=name,rub_price. id добавляется всегда"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(requested) - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+@lru_cache(maxsize=256)
+def projected_model(
+    base: Type[BaseModel], fields: Tuple[str, ...]
+) -> Type[BaseModel]:
+    """Модель только с запрошенными полями, кэшируется по набору полей"""
+    return create_model(
+        f"{base.__name__}Projection",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (base.model_fields[name].annotation, ...) for name in fields},
+    )
+
+
+def rows_to_dicts(rows, fields: Tuple[str, ...]) -> List[dict]:
+    """Строки select(*columns) в словари; для одной колонки строки - скаляры"""
+    if len(fields) == 1:
+        return [{fields[0]: row} for row in rows]
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def projection_response(
+    model: Type[BaseModel], items: list, page: Optional[dict] = None
+) -> Response:
+    """Сериализация проекции напрямую в JSON, минуя response_model"""
+    if page is None:
+        return serialized_response(List[model], items)
+    return serialized_response(Page[model], {"items": items, **page})
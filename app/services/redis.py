@@ -1,7 +1,37 @@
+import time
+
 import redis.asyncio as redis
 
+from app.services.metrics import REDIS_LATENCY
+from app.services.server_timing import add_timing
+from app.services.tracing import CLIENT, span
 from app.settings import settings
 
-redis_client = redis.from_url(
+# Снятие блокировки SET NX: удаляем ключ, только если он все еще наш. За долгую
+# операцию ключ мог истечь и достаться другому воркеру
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class InstrumentedRedis(redis.Redis):
+    """Клиент Redis с гистограммой времени команд"""
+
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        started = time.perf_counter()
+        try:
+            with span(f"redis {command}", CLIENT, **{"db.system": "redis"}):
+                return await super().execute_command(*args, **options)
+        finally:
+            elapsed = time.perf_counter() - started
+            REDIS_LATENCY.labels(command).observe(elapsed)
+            add_timing("redis", elapsed)
+
+
+redis_client = InstrumentedRedis.from_url(
     settings.REDIS_URL.unicode_string(), encoding="utf-8", decode_responses=True
 )
@@ -0,0 +1,47 @@
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.services.server_timing import timed
+
+
+def _orjson_default(value):
+    # Как и pydantic в JSON режиме, отдаем Decimal строкой: "1234.50"
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+class FastJSONResponse(ORJSONResponse):
+    """JSON ответ через orjson; UUID и datetime orjson кодирует сам"""
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return orjson.dumps(
+                content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS
+            )
+
+
+@lru_cache(maxsize=256)
+def _adapter(type_) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def serialized_response(type_, content: Any, status_code: int = 200) -> Response:
+    """
+    Валидация ORM объектов/строк в type_ и сериализация сразу в JSON байты
+    (pydantic-core), без второго прохода response_model и jsonable_encoder.
+    """
+    adapter = _adapter(type_)
+    with timed("serialize"):
+        body = adapter.dump_json(
+            adapter.validate_python(content, from_attributes=True)
+        )
+    return Response(
+        content=body, status_code=status_code, media_type="application/json"
+    )
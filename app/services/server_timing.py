@@ -0,0 +1,81 @@
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app.auth.utils import is_admin_scope
+from app.settings import settings
+
+# Порядок в заголовке; auth включает и свои запросы к базе
+SERVER_TIMING_NAMES = ("auth", "db", "redis", "http", "serialize")
+
+_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "server_timing", default=None
+)
+
+
+def add_timing(name: str, seconds: float):
+    """Добавить время к счетчику текущего запроса; без Server-Timing - ничего"""
+    timings = _timings.get()
+    if timings is not None:
+        total = timings.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+
+@contextlib.contextmanager
+def timed(name: str):
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - started)
+
+
+def _header(timings: Dict[str, List[float]], total: float) -> bytes:
+    parts = []
+    for name in SERVER_TIMING_NAMES:
+        if name in timings:
+            seconds, count = timings[name]
+            parts.append(f'{name};dur={seconds * 1000:.1f};desc="{count}x"')
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts).encode()
+
+
+class ServerTimingMiddleware:
+    """
+    Заголовок Server-Timing с временем на авторизацию, базу, Redis, внешние
+    HTTP запросы и сериализацию. В DEBUG для всех запросов, иначе только для
+    админского токена. Подключается, только если SERVER_TIMING или DEBUG.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (
+            settings.DEBUG or is_admin_scope(scope)
+        ):
+            return await self.app(scope, receive, send)
+
+        timings: Dict[str, List[float]] = {}
+        token = _timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", _header(timings, total)),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
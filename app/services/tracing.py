@@ -0,0 +1,398 @@
+import contextlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from app.settings import settings
+
+log = logging.getLogger(__name__)
+
+SERVICE_NAME = "metal-products"
+# Больше спанов в одном трейсе не держим (например, выгрузки по тысяче запросов)
+MAX_SPANS_PER_TRACE = 1000
+MAX_STATEMENT_LENGTH = 500
+# Коды SpanKind из OTLP
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Trace:
+    __slots__ = ("trace_id", "sampled", "spans")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List[Span] = []
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        trace: Trace,
+        name: str,
+        kind: int = INTERNAL,
+        parent_id: Optional[str] = None,
+        attributes: Optional[dict] = None,
+        start_ns: Optional[int] = None,
+    ):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def child(self, name: str, kind: int = INTERNAL, **attributes) -> "Span":
+        return Span(self.trace, name, kind, self.span_id, attributes)
+
+    def finish(self, end_ns: Optional[int] = None):
+        self.end_ns = end_ns or time.time_ns()
+        if len(self.trace.spans) < MAX_SPANS_PER_TRACE:
+            self.trace.spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span]) -> dict:
+    """Спаны в формате OTLP/JSON (ExportTraceServiceRequest)"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": _otlp_value(SERVICE_NAME)}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app"},
+                        "spans": [
+                            {
+                                "traceId": span.trace.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": span.kind,
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in span.attributes.items()
+                                ],
+                                "status": (
+                                    {"code": 2, "message": span.error}
+                                    if span.error
+                                    else {"code": 1}
+                                ),
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter(ABC):
+    """Куда отправлять завершенные трейсы; вызывается из фонового потока"""
+
+    @abstractmethod
+    def export(self, spans: List[Span]):
+        "Отправить спаны одного трейса"
+
+    def shutdown(self):
+        pass
+
+
+class FileExporter(SpanExporter):
+    """OTLP/JSON, один трейс на строку; без внешних сервисов"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans: List[Span]):
+        self.file.write(json.dumps(to_otlp(spans), ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def shutdown(self):
+        self.file.close()
+
+
+class OTLPHttpExporter(SpanExporter):
+    """OTLP/HTTP JSON, например в локальный collector: http://host:4318/v1/traces"""
+
+    def __init__(self, endpoint: str, timeout: float = 5):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(to_otlp(spans)).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class _ExportWorker:
+    """
+    Экспорт в отдельном потоке: запрос не ждет ни диска, ни сети. Очередь
+    ограничена: если экспорт не успевает (коллектор недоступен), новые трейсы
+    отбрасываются и считаются в counters["dropped"], а не копятся в памяти.
+    """
+
+    def __init__(
+        self, exporter: SpanExporter, maxsize: int = settings.TRACE_QUEUE_SIZE
+    ):
+        self.exporter = exporter
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.counters = Counter()
+        self.thread = threading.Thread(
+            target=self._run, name="trace-export", daemon=True
+        )
+        self.thread.start()
+
+    def _run(self):
+        while (spans := self.queue.get()) is not None:
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                log.warning("Trace export error: %s", e)
+        self.exporter.shutdown()
+
+    def submit(self, spans: List[Span]):
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            self.counters["dropped"] += 1
+
+    def stop(self, timeout: float = 5):
+        # Очередь может быть полна, а экспорт завис: поток daemon, не ждем вечно
+        with contextlib.suppress(queue.Full):
+            self.queue.put(None, timeout=timeout)
+        self.thread.join(timeout)
+
+
+_worker: Optional[_ExportWorker] = None
+
+
+def setup_tracing(exporter: Optional[SpanExporter] = None):
+    """
+    Включить трейсинг; exporter можно передать свой, иначе по настройкам:
+    TRACE_EXPORTER=file пишет в TRACE_FILE, otlp шлет на TRACE_OTLP_ENDPOINT.
+    """
+    global _worker
+    if _worker or not settings.TRACING_ENABLED:
+        return
+    if exporter is None:
+        if settings.TRACE_EXPORTER == "otlp":
+            exporter = OTLPHttpExporter(settings.TRACE_OTLP_ENDPOINT)
+        else:
+            exporter = FileExporter(settings.TRACE_FILE)
+    _worker = _ExportWorker(exporter)
+
+
+def stop_tracing():
+    global _worker
+    if _worker:
+        _worker.stop()
+        _worker = None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """Дочерний спан текущего; вне трейса ничего не делает"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name, kind, **attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+def record_span(
+    name: str,
+    started: float,
+    kind: int = CLIENT,
+    error: Optional[str] = None,
+    **attributes,
+):
+    """Задним числом: спан от started (time.perf_counter()) до текущего момента"""
+    parent = _current.get()
+    if parent is None:
+        return
+    elapsed_ns = int((time.perf_counter() - started) * 1e9)
+    end_ns = time.time_ns()
+    child = Span(
+        parent.trace,
+        name,
+        kind,
+        parent.span_id,
+        attributes,
+        start_ns=end_ns - elapsed_ns,
+    )
+    child.error = error
+    child.finish(end_ns)
+
+
+def instrument_engine(engine):
+    """Спан на каждый SQL запрос внутри трейса"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        parent = _current.get()
+        if parent is not None:
+            conn.info.setdefault("trace_spans", []).append(
+                parent.child(
+                    "db.query",
+                    CLIENT,
+                    **{
+                        "db.system": "postgresql",
+                        "db.statement": statement[:MAX_STATEMENT_LENGTH],
+                    },
+                )
+            )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().finish()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        spans = connection.info.get("trace_spans") if connection is not None else None
+        if spans:
+            failed = spans.pop()
+            failed.error = repr(exception_context.original_exception)
+            failed.finish()
+
+
+def _parse_traceparent(value: str):
+    # W3C traceparent: 00-<trace_id>-<parent_id>-<flags>
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+class TracingMiddleware:
+    """
+    Корневой спан запроса. Head-сэмплирование с долей TRACE_SAMPLE_RATE (или
+    по флагу из входящего traceparent); если TRACE_SLOW_MS задан, спаны пишутся
+    для всех запросов, а экспортируются еще и медленные и упавшие (tail).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        worker = _worker
+        if scope["type"] != "http" or worker is None:
+            return await self.app(scope, receive, send)
+
+        trace_id, parent_id, sampled = os.urandom(16).hex(), None, None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parsed = _parse_traceparent(value.decode("latin-1"))
+                if parsed:
+                    trace_id, parent_id, sampled = parsed
+                break
+        if sampled is None:
+            sampled = random.random() < settings.TRACE_SAMPLE_RATE
+        if not sampled and not settings.TRACE_SLOW_MS:
+            return await self.app(scope, receive, send)
+
+        trace = Trace(trace_id, sampled)
+        root = Span(trace, scope["path"], SERVER, parent_id)
+        token = _current.set(root)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            root.error = repr(e)
+            raise
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            template = route.path if route is not None else scope["path"]
+            root.name = f"{scope['method']} {template}"
+            root.attributes.update(
+                {
+                    "http.method": scope["method"],
+                    "http.route": template,
+                    "http.status_code": status,
+                }
+            )
+            if status >= 500 and not root.error:
+                root.error = f"HTTP {status}"
+            root.finish()
+            if (
+                trace.sampled
+                or root.error
+                or root.duration_ms >= settings.TRACE_SLOW_MS
+            ):
+                worker.submit(trace.spans)
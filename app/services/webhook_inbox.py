@@ -0,0 +1,35 @@
+from typing import Optional
+
+from app.services.redis import redis_client
+
+# Пока вебхук обрабатывается, дубли получают отказ и провайдер пришлет их позже
+PROCESSING_TTL = 60
+# После успешной обработки дубли сразу получают ответ без повторной работы
+DONE_TTL = 7 * 24 * 60 * 60
+
+PROCESSING = "processing"
+DONE = "done"
+
+
+def _key(event_id: str) -> str:
+    return f"webhook_event:{event_id}"
+
+
+async def claim_event(event_id: str) -> Optional[str]:
+    """
+    Захват события вебхука через SET NX.
+    Возвращает None, если событие захвачено этим запросом,
+    иначе текущее состояние события (processing или done).
+    """
+    if await redis_client.set(_key(event_id), PROCESSING, nx=True, ex=PROCESSING_TTL):
+        return None
+    return await redis_client.get(_key(event_id)) or PROCESSING
+
+
+async def complete_event(event_id: str):
+    await redis_client.set(_key(event_id), DONE, ex=DONE_TTL)
+
+
+async def release_event(event_id: str):
+    """Снять захват после ошибки, чтобы повторная доставка обработалась заново"""
+    await redis_client.delete(_key(event_id))
@@ -1,14 +1,19 @@
 from decimal import Decimal
+import logging
+import time
 from typing import List
 import aiohttp
 from app.services.schemas import DeliveryItem
+from app.services.metrics import record_outbound
 from app.settings import settings
 
+log = logging.getLogger(__name__)
+
 
 async def get_yandex_delivery_price(
     delivery_items: List[DeliveryItem], latitude: float, longitude: float
 ) -> Decimal:
-    url = "https://b2b.taxi.yandex.net/b2b/cargo/integration/v2/check-price"
+    url = settings.YANDEX_DELIVERY_URL
     headers = {
         "Content-Type": "application/json",
         "Accept-Language": "ru",
@@ -45,18 +50,24 @@ async def get_yandex_delivery_price(
         ],
         "requirements": {"cargo_type": "lcv_m", "taxi_class": "cargo"},
     }
-    print("Yandex delivery request payload:", payload)
+    log.debug("Yandex delivery request", extra={"payload": payload})
+    started = time.perf_counter()
     try:
         async with aiohttp.ClientSession() as session:
             async with session.post(url, json=payload, headers=headers) as response:
                 data = await response.json()
-                print("Yandex delivery response status:", response.status)
-                print("Yandex delivery response data:", data)
+                log.info(
+                    "Yandex delivery response",
+                    extra={"status": response.status, "price": data.get("price")},
+                )
+                log.debug("Yandex delivery response data", extra={"data": data})
+                record_outbound("yandex", started, response.status == 200)
                 if response.status == 200:
                     price = data.get("price", 0)
                     return Decimal(price)
                 else:
                     return Decimal()
     except Exception as e:
-        print("Error fetching Yandex delivery price:", e)
+        record_outbound("yandex", started, False)
+        log.warning("Error fetching Yandex delivery price: %s", e, exc_info=True)
         return Decimal()
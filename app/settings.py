@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import AnyHttpUrl, ConfigDict, PostgresDsn, RedisDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,15 +10,56 @@ class Settings(BaseSettings):
     POSTGRES_URL: PostgresDsn
     REDIS_URL: RedisDsn
     YANDEX_DELIVERY_API_KEY: str = ""
+    # Адреса внешних сервисов; в нагрузочном тесте подменяются заглушками
+    YANDEX_DELIVERY_URL: str = (
+        "https://b2b.taxi.yandex.net/b2b/cargo/integration/v2/check-price"
+    )
+    PAYKEEPER_URL: str = "https://237200454513.server.paykeeper.ru/"
+    TELEGRAM_API_URL: str = "https://api.telegram.org"
     TG_BOT_KEY: str = ""
     TG_CHAT_ID: str = ""
     TG_LOG_BOT_KEY: str = ""
     TG_LOG_CHAT_ID: str = ""
+    TG_LOG_QUEUE_SIZE: int = 1000
     DEBUG: bool = False
+    LOG_LEVEL: str = "INFO"
+    # Уровни и доля пропускаемых записей ниже WARNING по модулям (JSON в .env)
+    LOG_LEVELS: Dict[str, str] = {}
+    LOG_SAMPLING: Dict[str, float] = {}
+    # Заголовок Server-Timing для админского токена (в DEBUG - для всех)
+    SERVER_TIMING: bool = False
+    TRACING_ENABLED: bool = False
+    # Доля запросов, трейсы которых пишутся всегда (head sampling)
+    TRACE_SAMPLE_RATE: float = 0.01
+    # Остальные пишутся, только если запрос дольше стольких мс (0 - выключено)
+    TRACE_SLOW_MS: int = 1000
+    TRACE_EXPORTER: str = "file"
+    TRACE_FILE: str = "traces/spans.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    # Сколько трейсов ждут экспорта, сверх этого отбрасываются
+    TRACE_QUEUE_SIZE: int = 1000
     PAYKEEPER_USER: str = ""
     PAYKEEPER_PASSWORD: str = ""
     PAYKEEPER_SECRET: str = ""
+    PAYKEEPER_TOKEN_TTL: int = 12 * 60 * 60
+    PAYKEEPER_TOKEN_REFRESH_BEFORE: int = 60 * 60
     WEBHOOK_PREFIX: str = ""
+    ANALYTICS_REFRESH_SECONDS: int = 600
+    ORDER_ARCHIVE_DIR: str = "archive/orders"
+    # Профилирование запросов админа по X-Profile: 1 или ?profile=1
+    PROFILING_ENABLED: bool = False
+    PROFILES_DIR: str = "profiles"
+    PROFILES_KEEP: int = 50
+    # Не чаще одного профиля за столько секунд на все воркеры
+    PROFILE_MIN_INTERVAL: int = 30
+    PROFILE_SAMPLE_INTERVAL: float = 0.001
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL: int = 60
+    BCRYPT_ROUNDS: int = 12
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
 
     model_config = SettingsConfigDict(extra="ignore")
 
@@ -1,13 +1,33 @@
-from typing import Annotated
+from typing import Annotated, Union
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlmodel import Session, select
 from app.db import get_session
 from app.users.models import User, UserRole
-from app.users.schemas import UserCreate, UserResponse, UserLogin, Token, UserUpdate
-from app.auth.utils import get_password_hash, verify_password, create_access_token
-from app.auth.dependencies import get_current_user, get_admin_user
-from datetime import timedelta
+from app.users.schemas import (
+    RefreshRequest,
+    Token,
+    TokenData,
+    UserCreate,
+    UserLogin,
+    UserResponse,
+    UserUpdate,
+)
+from app.auth.utils import ACCESS_TOKEN_EXPIRE_MINUTES, create_user_access_token
+from app.auth.refresh_tokens import (
+    consume_refresh_token,
+    issue_refresh_token,
+    revoke_user_tokens,
+)
+from app.auth.passwords import hash_password, password_pool, verify_and_update_password
+from app.auth.dependencies import (
+    get_admin_user,
+    get_current_user,
+    get_verified_admin_user,
+)
+from app.auth.user_cache import user_cache
+from app.services.pagination import Page, fetch_page
+from app.services.responses import serialized_response
 from datetime import datetime
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -26,7 +46,7 @@ async def register(user_data: UserCreate, session: Session = Depends(get_session
         )
 
     # Создаем нового пользователя
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -46,20 +66,59 @@ async def login(user_data: UserLogin, session: Session = Depends(get_session)):
     user = (
         await session.exec(select(User).where(User.email == user_data.email))
     ).first()
-    print(user)
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-
-    access_token_expires = timedelta(minutes=60)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+    valid, new_hash = await verify_and_update_password(
+        user_data.password, user.hashed_password
     )
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if new_hash:
+        # Стоимость bcrypt поменялась: сохраняем хеш с новыми параметрами
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+
+    return await issue_tokens(user)
+
+
+async def issue_tokens(user: User) -> dict:
+    return {
+        "access_token": create_user_access_token(user),
+        "token_type": "bearer",
+        "refresh_token": await issue_refresh_token(user.id),
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest, session: Session = Depends(get_session)):
+    """Новая пара токенов по refresh токену; старый refresh токен гасится"""
+    user_id = await consume_refresh_token(data.refresh_token)
+    # Роль и сам пользователь проверяются по базе при каждой ротации
+    user = await session.get(User, user_id) if user_id else None
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await issue_tokens(user)
+
 
-    return {"access_token": access_token, "token_type": "bearer"}
+@router.post("/logout")
+async def logout(data: RefreshRequest):
+    """Выход: refresh токен больше не действует"""
+    await consume_refresh_token(data.refresh_token)
+    return {"message": "Logged out"}
 
 
 @router.get("/me", response_model=UserResponse)
@@ -68,22 +127,48 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-@router.get("/", response_model=list[UserResponse])
+@router.get("/", response_model=Union[list[UserResponse], Page[UserResponse]])
 async def get_users(
-    current_user: User = Depends(get_admin_user),
+    current_user: TokenData = Depends(get_admin_user),
     session: Session = Depends(get_session),
     offset: int = 0,
     limit: Annotated[int, Query(le=100)] = 100,
+    with_total: bool = False,
+    estimate: bool = False,
 ):
     """Получение списка всех пользователей (только для админов)"""
-    users = await session.exec(select(User).offset(offset).limit(limit)).all()
-    return users
+    query = select(User).order_by(User.created_at).offset(offset).limit(limit)
+    users, total, estimated = await fetch_page(session, query, with_total, estimate)
+    if not with_total:
+        return serialized_response(list[UserResponse], users)
+    return serialized_response(
+        Page[UserResponse],
+        {
+            "items": users,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "estimated": estimated,
+        },
+    )
+
+
+@router.get("/cache_metrics")
+async def user_cache_metrics(current_user: TokenData = Depends(get_admin_user)):
+    """Статистика кэша пользователей в этом воркере (только для админов)"""
+    return user_cache.metrics()
+
+
+@router.get("/password_metrics")
+async def password_pool_metrics(current_user: TokenData = Depends(get_admin_user)):
+    """Очередь и время хеширования паролей в этом воркере (только для админов)"""
+    return password_pool.metrics()
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: uuid.UUID,
-    current_user: User = Depends(get_admin_user),
+    current_user: TokenData = Depends(get_admin_user),
     session: Session = Depends(get_session),
 ):
     """Получение пользователя по ID (только для админов)"""
@@ -99,22 +184,25 @@ async def get_user(
 async def update_user(
     user_id: uuid.UUID,
     user_data: UserUpdate,
-    current_user: User = Depends(get_admin_user),
+    current_user: User = Depends(get_verified_admin_user),
     session: Session = Depends(get_session),
 ):
     """Обновление пользователя (только для админов)"""
-    user = await session.exec(select(User).where(User.id == user_id))
+    user = (await session.exec(select(User).where(User.id == user_id))).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
+    old_email = user.email
     # Обновляем поля
     if user_data.email is not None:
         # Проверяем, что email не занят другим пользователем
-        existing_user = await session.exec(
-            select(User).where(User.email == user_data.email, User.id != user_id)
-        )
+        existing_user = (
+            await session.exec(
+                select(User).where(User.email == user_data.email, User.id != user_id)
+            )
+        ).first()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -123,7 +211,7 @@ async def update_user(
         user.email = user_data.email
 
     if user_data.password is not None:
-        user.hashed_password = get_password_hash(user_data.password)
+        user.hashed_password = await hash_password(user_data.password)
 
     if user_data.role is not None:
         user.role = user_data.role
@@ -133,6 +221,10 @@ async def update_user(
     session.add(user)
     await session.commit()
     await session.refresh(user)
+    await user_cache.invalidate(*{old_email, user.email})
+    if user_data.model_dump(exclude_none=True):
+        # Почта, пароль или роль поменялись: старые сессии больше не действуют
+        await revoke_user_tokens(user.id)
 
     return user
 
@@ -140,11 +232,11 @@ async def update_user(
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: uuid.UUID,
-    current_user: User = Depends(get_admin_user),
+    current_user: User = Depends(get_verified_admin_user),
     session: Session = Depends(get_session),
 ):
     """Удаление пользователя (только для админов)"""
-    user = await session.exec(select(User).where(User.id == user_id))
+    user = (await session.exec(select(User).where(User.id == user_id))).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -152,5 +244,7 @@ async def delete_user(
 
     await session.delete(user)
     await session.commit()
+    await user_cache.invalidate(user.email)
+    await revoke_user_tokens(user.id)
 
     return {"message": "User deleted successfully"}
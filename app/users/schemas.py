@@ -37,7 +37,15 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[uuid.UUID] = None
+    role: Optional[UserRole] = None
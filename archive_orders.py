@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Скрипт для переноса старых завершенных заявок в архив
+
+    python archive_orders.py --months 12 --batch-size 1000 --vacuum
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.db import engine
+from app.orders.archive import HOT_TABLES, archive_batch, table_sizes
+from app.settings import settings
+
+
+def print_sizes(title: str, sizes: dict):
+    print(title)
+    for table, size in sizes.items():
+        print(
+            f"  {table}: таблица {size['table'] // 1024} КБ, "
+            f"индексы {size['indexes'] // 1024} КБ"
+        )
+
+
+async def archive_orders(months: int, batch_size: int, directory: str, vacuum: bool):
+    """Архивация заявок пачками"""
+    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    cutoff = datetime.now() - timedelta(days=30 * months)
+
+    async with async_session() as session:
+        print_sizes("Размер до архивации:", await table_sizes(session))
+        await session.commit()
+
+        total = 0
+        while archived := await archive_batch(session, cutoff, batch_size, directory):
+            total += archived
+            print(f"Перенесено в архив: {total}")
+        print(f"Готово, заявок в архиве за проход: {total}")
+
+    if vacuum and total:
+        # VACUUM не работает внутри транзакции
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            for table in HOT_TABLES:
+                await connection.execute(text(f"VACUUM (ANALYZE) {table}"))
+
+    async with async_session() as session:
+        print_sizes("Размер после архивации:", await table_sizes(session))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dir", default=settings.ORDER_ARCHIVE_DIR)
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(archive_orders(args.months, args.batch_size, args.dir, args.vacuum))
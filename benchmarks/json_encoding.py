@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Сравнение стандартного пути FastAPI (response_model + jsonable_encoder +
+json.dumps) с serialized_response (pydantic-core сразу в JSON байты)
+
+    python -m benchmarks.json_encoding --items 100 --repeat 200
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+# Product ссылается на Category строкой: без этого импорта маппер не собирается
+import app.categories.models  # noqa: F401
+from app.orders.schemas import OrderRead
+from app.products.models import Product
+from app.services.responses import FastJSONResponse, serialized_response
+from benchmarks.projections import make_orders, make_products
+
+
+async def fastapi_default(field, items) -> bytes:
+    content = await serialize_response(field=field, response_content=items)
+    return JSONResponse(content).body
+
+
+async def fastapi_orjson(field, items) -> bytes:
+    content = await serialize_response(field=field, response_content=items)
+    return FastJSONResponse(content).body
+
+
+async def direct(type_, items) -> bytes:
+    return serialized_response(type_, items).body
+
+
+async def measure(func, target, items, repeat: int) -> dict:
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await func(target, items)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "payload_bytes": len(body),
+        "p50_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    datasets = {
+        "products": (
+            List[Product],
+            [Product(**product) for product in make_products(args.items)],
+        ),
+        "orders": (List[OrderRead], make_orders(args.items)),
+    }
+    report = {"items": args.items}
+    for name, (type_, items) in datasets.items():
+        field = create_response_field(name="response", type_=type_)
+        report[name] = {
+            "fastapi_default": await measure(
+                fastapi_default, field, items, args.repeat
+            ),
+            "fastapi_orjson": await measure(fastapi_orjson, field, items, args.repeat),
+            "serialized_response": await measure(direct, type_, items, args.repeat),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Сквозной нагрузочный тест: приложение под uvicorn, внешние сервисы - заглушки
+
+    python -m benchmarks.load_test --duration 60 --concurrency 50
+    python -m benchmarks.load_test --stub yandex=300:0.05 --output run.json
+    python -m benchmarks.load_test --compare baseline.json
+
+Поднимает заглушки Яндекс Доставки, Paykeeper и Telegram (benchmarks.stubs),
+запускает приложение отдельным процессом с адресами заглушек и гоняет
+смешанный трафик: каталог, расчет доставки, создание заявок и шторм
+повторных вебхуков. Отчет - JSON с пропускной способностью и p50/p95/p99
+по эндпоинтам, его можно сравнивать между коммитами через --compare.
+
+Нужны отдельные Postgres и Redis из .env (тест создает заявки) и заполненный
+каталог: хотя бы одна категория и товар.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import List, Optional
+
+import aiohttp
+
+from benchmarks.stubs import ProviderStubs, StubConfig, stub_configs
+
+WEBHOOK_PREFIX = "bench"
+PAYKEEPER_SECRET = "bench-secret"
+DEFAULT_MIX = "browse=70,estimate=10,order=10,webhook=10"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу; values отсортированы"""
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = mix.keys() - SCENARIOS.keys()
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown scenarios: {', '.join(unknown)}")
+    return mix
+
+
+def parse_stub(value: str):
+    # yandex=300:0.05 - задержка 300 мс, 5% ошибок
+    name, _, spec = value.partition("=")
+    latency, _, error_rate = spec.partition(":")
+    return name, float(latency), float(error_rate or 0)
+
+
+class Recorder:
+    """Латентность и статусы по эндпоинтам; до конца прогрева не пишет"""
+
+    def __init__(self, record_from: float):
+        self.record_from = record_from
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def add(self, endpoint: str, started: float, status: int):
+        if started >= self.record_from:
+            self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+            self.statuses[endpoint][status] += 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 1),
+                # 0 - сетевая ошибка или таймаут
+                "errors": sum(n for s, n in statuses.items() if s == 0 or s >= 500),
+                "statuses": {str(s): n for s, n in sorted(statuses.items())},
+                "p50_ms": round(percentile(values, 0.50), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+                "max_ms": round(values[-1], 2),
+            }
+        total = sum(item["requests"] for item in endpoints.values())
+        return {
+            "requests": total,
+            "rps": round(total / elapsed, 1) if elapsed else 0,
+            "errors": sum(item["errors"] for item in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+
+class Client:
+    """Виртуальные покупатели поверх одного aiohttp клиента"""
+
+    def __init__(self, session, base_url, recorder, catalog, rng, duplicates):
+        self.session = session
+        self.base_url = base_url
+        self.recorder = recorder
+        self.categories, self.products = catalog
+        self.random = rng
+        self.duplicates = duplicates
+        # Заявки, по которым еще не приходил вебхук
+        self.unpaid = []
+
+    def _client_ip(self) -> str:
+        # RateLimiter считает по X-Forwarded-For: каждый запрос как новый клиент
+        return "10.{}.{}.{}".format(*(self.random.randrange(256) for _ in range(3)))
+
+    async def request(self, method, endpoint, path, **kwargs):
+        headers = kwargs.pop("headers", {})
+        headers.setdefault("X-Forwarded-For", self._client_ip())
+        started = time.perf_counter()
+        try:
+            async with self.session.request(
+                method, self.base_url + path, headers=headers, **kwargs
+            ) as response:
+                body = await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.recorder.add(f"{method} {endpoint}", started, 0)
+            return 0, None
+        self.recorder.add(f"{method} {endpoint}", started, status)
+        return status, body
+
+    def _order_body(self, payment_method: str = "offline") -> dict:
+        count = min(len(self.products), self.random.randint(1, 5))
+        return {
+            "product_links": [
+                {"product_id": product["id"], "quantity": self.random.randint(1, 20)}
+                for product in self.random.sample(self.products, count)
+            ],
+            "detail": {
+                "first_name": "Нагрузочный тест",
+                "phone": f"+7999{self.random.randrange(10**7):07d}",
+                "address": "Санкт-Петербург",
+                "latitude": f"{59.8 + self.random.random() * 0.3:.6f}",
+                "longitude": f"{30.1 + self.random.random() * 0.4:.6f}",
+            },
+            "payment_method": payment_method,
+        }
+
+    async def browse(self):
+        await self.request("GET", "/api/categories/", "/api/categories/")
+        category = self.random.choice(self.categories)
+        await self.request(
+            "GET",
+            "/api/products/",
+            "/api/products/",
+            params={"category_id": category["id"], "limit": 20},
+        )
+        for _ in range(self.random.randint(1, 3)):
+            product = self.random.choice(self.products)
+            await self.request(
+                "GET", "/api/products/{id}", f"/api/products/{product['id']}"
+            )
+
+    async def estimate(self):
+        await self.request(
+            "POST",
+            "/api/orders/estimate_delivery",
+            "/api/orders/estimate_delivery",
+            json=self._order_body(),
+        )
+
+    async def order(self):
+        payment_method = "online" if self.random.random() < 0.5 else "offline"
+        body = self._order_body(payment_method)
+        status, body = await self.request(
+            "POST", "/api/orders/", "/api/orders/", json=body
+        )
+        if status == 201:
+            self.unpaid.append(json.loads(body))
+
+    async def webhook(self):
+        if not self.unpaid:
+            await self.order()
+        if not self.unpaid:
+            return
+        order = self.unpaid.pop(self.random.randrange(len(self.unpaid)))
+        # Поля в том порядке, в котором Paykeeper считает подпись
+        data = {
+            "id": str(self.random.getrandbits(40)),
+            "sum": order["amount"],
+            "clientid": order["detail"]["first_name"],
+            "orderid": order["id"],
+        }
+        data["key"] = hashlib.md5(
+            ("".join(data.values()) + PAYKEEPER_SECRET).encode()
+        ).hexdigest()
+        path = f"/api/orders/{WEBHOOK_PREFIX}/payment_webhook"
+        # Провайдер шлет одно событие несколько раз параллельно
+        await asyncio.gather(
+            *(
+                self.request("POST", "/api/orders/payment_webhook", path, json=data)
+                for _ in range(self.duplicates)
+            )
+        )
+
+
+SCENARIOS = {
+    "browse": Client.browse,
+    "estimate": Client.estimate,
+    "order": Client.order,
+    "webhook": Client.webhook,
+}
+
+
+async def wait_ready(session, base_url: str, app_process, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if app_process is not None and app_process.poll() is not None:
+            raise RuntimeError("Application exited during startup")
+        try:
+            async with session.get(f"{base_url}/api/categories/") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("Application did not become ready")
+
+
+async def load_catalog(session, base_url: str):
+    async with session.get(f"{base_url}/api/categories/") as response:
+        categories = await response.json()
+    async with session.get(
+        f"{base_url}/api/products/", params={"limit": 500}
+    ) as response:
+        products = await response.json()
+    if not categories or not products:
+        raise RuntimeError("Catalog is empty: add categories and products first")
+    return categories, products
+
+
+def start_app(args, stubs: ProviderStubs) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        **stubs.urls(),
+        "WEBHOOK_PREFIX": WEBHOOK_PREFIX,
+        "PAYKEEPER_SECRET": PAYKEEPER_SECRET,
+        "PAYKEEPER_USER": "bench",
+        "PAYKEEPER_PASSWORD": "bench",
+        "YANDEX_DELIVERY_API_KEY": "bench",
+        "TG_LOG_BOT_KEY": "bench",
+        "TG_LOG_CHAT_ID": "1",
+        "LOG_LEVEL": "WARNING",
+        "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp(prefix="bench-prometheus-"),
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+            "--no-access-log",
+        ],
+        env=env,
+    )
+
+
+def compare(report: dict, baseline_path: str):
+    """Изменение p95 и rps относительно прошлого прогона, в stderr"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"{report['commit']} vs {baseline.get('commit')}", file=sys.stderr)
+    for endpoint, current in report["endpoints"].items():
+        previous = baseline["endpoints"].get(endpoint)
+        if previous is None or not previous["p95_ms"]:
+            continue
+        change = (current["p95_ms"] / previous["p95_ms"] - 1) * 100
+        print(
+            f"  {endpoint:<40} p95 {previous['p95_ms']} -> {current['p95_ms']} ms"
+            f" ({change:+.0f}%), rps {previous['rps']} -> {current['rps']}",
+            file=sys.stderr,
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--duration", type=float, default=60, help="секунды")
+    parser.add_argument("--warmup", type=float, default=5, help="секунды")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--webhook-duplicates", type=int, default=5)
+    parser.add_argument("--stub-latency", type=float, default=80, help="мс")
+    parser.add_argument("--stub-jitter", type=float, default=40, help="мс")
+    parser.add_argument("--stub-error-rate", type=float, default=0.01)
+    parser.add_argument(
+        "--stub",
+        type=parse_stub,
+        action="append",
+        default=[],
+        help="NAME=LATENCY_MS[:ERROR_RATE], например yandex=300:0.05",
+    )
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--base-url", help="Уже запущенное приложение (заглушки тогда не нужны)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Файл для JSON отчета")
+    parser.add_argument("--compare", help="JSON отчет прошлого прогона")
+    args = parser.parse_args()
+
+    overrides = {
+        name: StubConfig(latency, args.stub_jitter, error_rate)
+        for name, latency, error_rate in args.stub
+    }
+    stubs = ProviderStubs(
+        stub_configs(
+            args.stub_latency, args.stub_jitter, args.stub_error_rate, **overrides
+        ),
+        seed=args.seed,
+    )
+    app_process = None
+    base_url = args.base_url
+    if base_url is None:
+        await stubs.start()
+        app_process = start_app(args, stubs)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency * args.webhook_duplicates)
+    timeout = aiohttp.ClientTimeout(total=30)
+    try:
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout
+        ) as session:
+            await wait_ready(session, base_url, app_process)
+            catalog = await load_catalog(session, base_url)
+
+            started = time.perf_counter()
+            recorder = Recorder(started + args.warmup)
+            deadline = started + args.warmup + args.duration
+            names, weights = zip(*args.mix.items())
+
+            async def user(index: int):
+                rng = random.Random(args.seed * 100003 + index)
+                client = Client(
+                    session, base_url, recorder, catalog, rng, args.webhook_duplicates
+                )
+                while time.perf_counter() < deadline:
+                    scenario = rng.choices(names, weights)[0]
+                    await SCENARIOS[scenario](client)
+
+            await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+            elapsed = time.perf_counter() - recorder.record_from
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+        await stubs.stop()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "mix": args.mix,
+            "webhook_duplicates": args.webhook_duplicates,
+            "seed": args.seed,
+        },
+        "elapsed_s": round(elapsed, 2),
+        **recorder.report(elapsed),
+        "stubs": stubs.stats() if app_process is not None else None,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
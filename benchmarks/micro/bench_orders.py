@@ -0,0 +1,43 @@
+import pytest
+
+from app.orders.pricing import price_cart
+from app.orders.schemas import OrderDetailCreate
+from app.products.models import Product
+from benchmarks.projections import make_products
+
+ITEMS = 100
+
+
+def make_details(count: int):
+    # Разные ветки валидаторов: только email, только телефон, с координатами
+    details = []
+    for i in range(count):
+        detail = {"first_name": "Иван", "comment": ""}
+        if i % 3 != 1:
+            detail["email"] = f"client{i}@example.com"
+        if i % 3 != 0:
+            detail["phone"] = "+7 (900) 123-45-67"
+        if i % 2:
+            detail.update(latitude="59.93", longitude="30.31")
+        details.append(detail)
+    return details
+
+
+@pytest.mark.benchmark(group="orders")
+def test_order_detail_validation(benchmark):
+    details = make_details(ITEMS)
+    result = benchmark(
+        lambda: [OrderDetailCreate.model_validate(detail) for detail in details]
+    )
+    assert len(result) == ITEMS
+
+
+@pytest.mark.benchmark(group="orders")
+def test_price_cart(benchmark):
+    # Крупная корзина: create_order считает ее в транзакции с блокировками
+    products = [Product(**product) for product in make_products(50)]
+    quantities = {product.id: i + 1 for i, product in enumerate(products)}
+    amount, delivery_items = benchmark(price_cart, products, quantities)
+    assert len(delivery_items) == len(products)
+    assert amount == sum(p.rub_price * quantities[p.id] for p in products)
+
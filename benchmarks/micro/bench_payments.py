@@ -0,0 +1,59 @@
+import hashlib
+
+import pytest
+
+from app.services.payment_systems.paykeeper import Paykeeper
+
+# Ответ Paykeeper на создание счета: искомый ключ в конце
+INVOICE_RESPONSE = {
+    **{f"field_{i}": str(i) for i in range(20)},
+    "invoice": "<html>" + "x" * 2000 + "</html>",
+    "invoice_id": "20240101123456",
+    "invoice_url": "https://example.server.paykeeper.ru/bill/20240101123456/",
+}
+
+
+def make_webhook() -> dict:
+    data = {
+        "id": "123456",
+        "sum": "15900.00",
+        "clientid": "Иван",
+        "orderid": "0a4a4b5e-2c1f-4d5e-9a4b-1c2d3e4f5a6b",
+        "service_name": "Покупка товаров",
+        "client_email": "client@example.com",
+        "client_phone": "+79001234567",
+        "ps_id": "1",
+        "batch_date": "2024-01-01",
+        "fop_receipt_key": "",
+        "bank_id": "",
+        "card_number": "2200********1234",
+        "card_holder": "IVAN IVANOV",
+        "card_expiry": "12/30",
+    }
+    signed = "".join(data[key] for key in ("id", "sum", "clientid", "orderid"))
+    data["key"] = hashlib.md5((signed + Paykeeper.SECRET).encode()).hexdigest()
+    return data
+
+
+@pytest.mark.benchmark(group="payments")
+def test_get_param(benchmark):
+    result = benchmark(Paykeeper._get_param, INVOICE_RESPONSE, "invoice_url")
+    assert result == INVOICE_RESPONSE["invoice_url"]
+
+
+@pytest.mark.benchmark(group="payments")
+def test_get_param_missing(benchmark):
+    assert benchmark(Paykeeper._get_param, INVOICE_RESPONSE, "token") is None
+
+
+@pytest.mark.benchmark(group="payments")
+def test_check_webhook(benchmark):
+    payment_system = Paykeeper()
+    assert benchmark(payment_system.check_webhook, make_webhook())
+
+
+@pytest.mark.benchmark(group="payments")
+def test_callback_response(benchmark):
+    payment_system = Paykeeper()
+    response = benchmark(payment_system.get_callback_response, "123456")
+    assert response.startswith("OK ")
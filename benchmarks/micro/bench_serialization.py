@@ -0,0 +1,54 @@
+from typing import List
+
+import pytest
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.orders.schemas import OrderRead
+from app.products.models import Product
+from app.services.responses import serialized_response
+from benchmarks.projections import make_orders, make_products
+
+# Типичная страница каталога и списка заявок
+ITEMS = 100
+
+
+@pytest.fixture(scope="module")
+def products():
+    return [Product(**product) for product in make_products(ITEMS)]
+
+
+@pytest.fixture(scope="module")
+def orders():
+    return make_orders(ITEMS)
+
+
+@pytest.mark.benchmark(group="products")
+def test_products_response_model(benchmark, run, products):
+    # Путь FastAPI по умолчанию: валидация response_model и jsonable_encoder
+    field = create_response_field(name="response", type_=List[Product])
+    result = benchmark(
+        lambda: run(serialize_response(field=field, response_content=products))
+    )
+    assert len(result) == ITEMS
+
+
+@pytest.mark.benchmark(group="products")
+def test_products_serialized_response(benchmark, products):
+    response = benchmark(serialized_response, List[Product], products)
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group="orders")
+def test_orders_response_model(benchmark, run, orders):
+    field = create_response_field(name="response", type_=List[OrderRead])
+    result = benchmark(
+        lambda: run(serialize_response(field=field, response_content=orders))
+    )
+    assert len(result) == ITEMS
+
+
+@pytest.mark.benchmark(group="orders")
+def test_orders_serialized_response(benchmark, orders):
+    response = benchmark(serialized_response, List[OrderRead], orders)
+    assert response.status_code == 200
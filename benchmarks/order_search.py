@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска заявок (OrderFilter.search) на большом объеме данных
+
+    python -m benchmarks.order_search --seed 1000000
+    python -m benchmarks.order_search --explain
+    python -m benchmarks.order_search --cleanup
+
+Заявки с external_id 'bench-...' создаются и удаляются только этим скриптом.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db import engine
+from app.orders.filters import OrderFilter
+from app.orders.models import Order
+
+# Заявки бенчмарка помечены префиксом external_id: сид и очистка трогают
+# только их, реальные заявки остаются как есть
+BENCH_PREFIX = "bench-"
+
+SEED_SQL = """
+WITH orders AS (
+    INSERT INTO "order" (id, status, amount, amount_paid, external_id,
+                         payment_data, created_at, updated_at)
+    SELECT gen_random_uuid(), 'PAID', 1000 + g % 50000, 1000 + g % 50000,
+           CAST(:prefix AS text) || (300000000 + g)::text, '{}'::json,
+           now() - g * interval '30 seconds', now()
+    FROM generate_series(1, :count) AS g
+    RETURNING id
+)
+INSERT INTO orderdetail (id, order_id, email, phone, first_name, delivery_price)
+SELECT gen_random_uuid(), o.id,
+       'client' || row_number() OVER () || '@example.com',
+       '+7 (9' || lpad((row_number() OVER () % 100)::text, 2, '0') || ') '
+           || lpad((row_number() OVER () % 10000000)::text, 7, '0'),
+       'bench', 500
+FROM orders o
+"""
+
+# Внешние ключи без каскада: сначала строки заявок, затем детали, затем заявки
+BENCH_ORDERS = (
+    """SELECT id FROM "order" WHERE external_id LIKE CAST(:prefix AS text) || '%'"""
+)
+CLEANUP_SQL = [
+    f"DELETE FROM orderproductlink WHERE order_id IN ({BENCH_ORDERS})",
+    f"DELETE FROM orderdetail WHERE order_id IN ({BENCH_ORDERS})",
+    f"DELETE FROM \"order\" WHERE id IN ({BENCH_ORDERS})",
+]
+
+SEARCH_TERMS = {
+    "full_uuid": None,  # подставляется существующий id
+    "uuid_prefix": None,
+    "full_phone": "+7 (900) 0012345",
+    "phone_part": "0012",
+    "email_part": "client4242",
+    "external_id": f"{BENCH_PREFIX}300004242",
+    "miss": "nothing-matches-this",
+}
+
+
+async def seed(count: int):
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(SEED_SQL), {"count": count, "prefix": BENCH_PREFIX}
+        )
+        await connection.execute(text('ANALYZE "order"'))
+        await connection.execute(text("ANALYZE orderdetail"))
+
+
+async def cleanup():
+    async with engine.begin() as connection:
+        for statement in CLEANUP_SQL:
+            await connection.execute(text(statement), {"prefix": BENCH_PREFIX})
+
+
+async def run(repeat: int, explain: bool) -> dict:
+    async with AsyncSession(engine) as session:
+        total = (await session.exec(text('SELECT count(*) FROM "order"'))).scalar()
+        sample_id = (await session.exec(select(Order.id).limit(1))).first()
+        terms = dict(SEARCH_TERMS)
+        terms["full_uuid"] = str(sample_id)
+        terms["uuid_prefix"] = str(sample_id)[:8]
+
+        report = {"orders": total, "repeat": repeat, "searches": {}}
+        for name, term in terms.items():
+            query = OrderFilter(search=term).filter(select(Order.id)).limit(100)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = (await session.exec(query)).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            report["searches"][name] = {
+                "term": term,
+                "rows": len(rows),
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+                "max_ms": round(timings[-1], 2),
+            }
+            if explain:
+                compiled = query.compile(
+                    engine.sync_engine, compile_kwargs={"literal_binds": True}
+                )
+                plan = await session.exec(text(f"EXPLAIN ANALYZE {compiled}"))
+                report["searches"][name]["plan"] = [row[0] for row in plan]
+    return report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", type=int, default=0, help="Сколько заявок создать")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--explain", action="store_true")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        await cleanup()
+        return
+    if args.seed:
+        await seed(args.seed)
+    report = await run(args.repeat, args.explain)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
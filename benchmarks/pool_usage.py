@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Использование пула соединений под синтетической нагрузкой витрины
+
+    python -m benchmarks.pool_usage --requests 2000 --concurrency 50
+    python -m benchmarks.pool_usage --token <JWT> --auth-share 0.2
+
+Запросы идут прямо в ASGI приложение, без сети. Нужны Postgres и Redis из .env
+и хотя бы один товар и категория в базе. Считается, сколько раз соединение
+бралось из пула на запрос, пиковое число занятых соединений и время удержания.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter
+
+from sqlalchemy import event, text
+
+from app.db import engine
+from app.main import app
+
+
+class PoolStats:
+    def __init__(self, pool):
+        self.counters = Counter()
+        self.checked_out = 0
+        self.peak = 0
+        self.hold_ms = []
+        self._started = {}
+        event.listen(pool, "checkout", self._checkout)
+        event.listen(pool, "checkin", self._checkin)
+
+    def _checkout(self, dbapi_connection, record, proxy):
+        self.counters["checkouts"] += 1
+        self.checked_out += 1
+        self.peak = max(self.peak, self.checked_out)
+        self._started[id(record)] = time.perf_counter()
+
+    def _checkin(self, dbapi_connection, record):
+        self.checked_out -= 1
+        started = self._started.pop(id(record), None)
+        if started is not None:
+            self.hold_ms.append((time.perf_counter() - started) * 1000)
+
+
+async def asgi_get(path: str, query: str = "", headers=()) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+    status = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--token", default="", help="JWT для части запросов")
+    parser.add_argument("--auth-share", type=float, default=0.0)
+    args = parser.parse_args()
+
+    async with engine.connect() as connection:
+        product_id = (
+            await connection.execute(text("SELECT id FROM product LIMIT 1"))
+        ).scalar()
+        category_id = (
+            await connection.execute(text("SELECT id FROM category LIMIT 1"))
+        ).scalar()
+
+    # Типичная витрина: каталог, карточка товара, категории
+    routes = [
+        ("/api/products/", f"category_id={category_id}&limit=20"),
+        ("/api/products/", "is_main=true&limit=12"),
+        (f"/api/products/{product_id}", ""),
+        ("/api/categories/", ""),
+        (f"/api/categories/{category_id}", ""),
+    ]
+    random.seed(0)
+    stats = PoolStats(engine.sync_engine.pool)
+    statuses = Counter()
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        path, query = random.choice(routes)
+        headers = ()
+        if args.token and random.random() < args.auth_share:
+            headers = (("authorization", f"Bearer {args.token}"),)
+        async with semaphore:
+            started = time.perf_counter()
+            statuses[await asgi_get(path, query, headers)] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "rps": round(args.requests / elapsed, 1),
+        "statuses": dict(statuses),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "pool_size": engine.sync_engine.pool.size(),
+        "checkouts": stats.counters["checkouts"],
+        "checkouts_per_request": round(
+            stats.counters["checkouts"] / args.requests, 3
+        ),
+        "peak_checked_out": stats.peak,
+        "hold_p50_ms": round(statistics.median(stats.hold_ms), 2)
+        if stats.hold_ms
+        else None,
+    }
+    print(json.dumps(report, indent=2))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
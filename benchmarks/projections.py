@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Сравнение полной сериализации списков и проекций (параметр fields=)
+
+    python -m benchmarks.projections --items 100 --repeat 200
+
+Данные синтетические, база не нужна: меряется только валидация и JSON.
+"""
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+from pydantic import TypeAdapter
+
+# Product ссылается на Category строкой: без этого импорта маппер не собирается
+import app.categories.models  # noqa: F401
+from app.orders.models import OrderStatus
+from app.orders.schemas import OrderRead
+from app.products.models import Product
+from app.services.projection import projected_model
+
+
+def make_products(count: int) -> List[dict]:
+    return [
+        {
+            "id": uuid.uuid4(),
+            "name": f"Профнастил С{i}",
+            "description": "Оцинкованный профилированный лист. " * 40,
+            "rub_price": Decimal("1234.50") + i,
+            "is_active": True,
+            "is_main": i % 10 == 0,
+            "images": [
+                f"https://example.com/api/static/products/{i}_{n}.jpg"
+                for n in range(4)
+            ],
+            "characteristics": [
+                {"name": f"Характеристика {n}", "value": str(n), "is_main": n == 0}
+                for n in range(8)
+            ],
+            "weight": Decimal("12.5"),
+            "width": Decimal("1.15"),
+            "height": Decimal("0.02"),
+            "length": Decimal("2.0"),
+            "created_at": datetime.now(),
+            "updated_at": datetime.now(),
+            "category_id": uuid.uuid4(),
+        }
+        for i in range(count)
+    ]
+
+
+def make_orders(count: int) -> List[dict]:
+    orders = []
+    for i in range(count):
+        order_id = uuid.uuid4()
+        orders.append(
+            {
+                "id": order_id,
+                "status": OrderStatus.PAID,
+                "amount": Decimal("15000.00"),
+                "amount_paid": Decimal("15000.00"),
+                "product_links": [
+                    {
+                        "product_id": uuid.uuid4(),
+                        "quantity": n + 1,
+                        "unit_price": Decimal("1000.00"),
+                        "product_name": f"Профнастил С{n}",
+                    }
+                    for n in range(5)
+                ],
+                "detail": {
+                    "id": uuid.uuid4(),
+                    "order_id": order_id,
+                    "email": f"client{i}@example.com",
+                    "phone": "+7 (900) 123-45-67",
+                    "first_name": "Иван",
+                    "address": "Санкт-Петербург, Невский пр., 1",
+                    "latitude": "59.93",
+                    "longitude": "30.31",
+                    "comment": "",
+                    "delivery_price": Decimal("900.00"),
+                },
+                "created_at": datetime.now(),
+                "updated_at": datetime.now(),
+                "payment_data": {"payment_url": "https://example.com/pay/123"},
+                "external_id": str(300000000 + i),
+            }
+        )
+    return orders
+
+
+def measure(adapter: TypeAdapter, items: list, repeat: int) -> dict:
+    timings = []
+    payload = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = adapter.dump_json(adapter.validate_python(items))
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "payload_bytes": len(payload),
+        "p50_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    products = make_products(args.items)
+    orders = make_orders(args.items)
+    product_fields = ("id", "name", "rub_price", "images")
+    order_fields = ("id", "status", "amount", "created_at")
+
+    report = {
+        "items": args.items,
+        "products_full": measure(TypeAdapter(List[Product]), products, args.repeat),
+        "products_projection": measure(
+            TypeAdapter(List[projected_model(Product, product_fields)]),
+            [{field: p[field] for field in product_fields} for p in products],
+            args.repeat,
+        ),
+        "orders_full": measure(TypeAdapter(List[OrderRead]), orders, args.repeat),
+        "orders_projection": measure(
+            TypeAdapter(List[projected_model(OrderRead, order_fields)]),
+            [{field: o[field] for field in order_fields} for o in orders],
+            args.repeat,
+        ),
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Локальные заглушки Яндекс Доставки, Paykeeper и Telegram для нагрузочного теста
+
+Каждая заглушка отвечает с заданной задержкой (мс, равномерно в диапазоне
+latency..latency+jitter) и с долей ошибок error_rate (HTTP 500). Можно
+поднять отдельно, например чтобы погонять приложение руками:
+
+    python -m benchmarks.stubs --port 8900 --latency 50 --error-rate 0.01
+
+и прописать в .env адреса, которые печатаются при старте.
+"""
+
+import argparse
+import asyncio
+import random
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+
+from aiohttp import web
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0
+
+
+class ProviderStubs:
+    """Один aiohttp сервер, три провайдера на разных префиксах пути"""
+
+    def __init__(self, configs: dict, seed: int = 0):
+        self.configs = configs
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.errors = Counter()
+        self._runner = None
+        self.port = None
+
+        app = web.Application()
+        app.router.add_post(
+            "/yandex/b2b/cargo/integration/v2/check-price", self._yandex_price
+        )
+        app.router.add_get("/paykeeper/info/settings/token/", self._paykeeper_token)
+        app.router.add_post(
+            "/paykeeper/change/invoice/preview/", self._paykeeper_invoice
+        )
+        app.router.add_post("/telegram/{bot}/sendMessage", self._telegram_send)
+        self.app = app
+
+    def urls(self) -> dict:
+        """Переменные окружения приложения, указывающие на заглушки"""
+        base = f"http://127.0.0.1:{self.port}"
+        return {
+            "YANDEX_DELIVERY_URL": (
+                f"{base}/yandex/b2b/cargo/integration/v2/check-price"
+            ),
+            "PAYKEEPER_URL": f"{base}/paykeeper/",
+            "TELEGRAM_API_URL": f"{base}/telegram",
+        }
+
+    async def start(self, port: int = 0):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    def stats(self) -> dict:
+        return {
+            name: {"calls": self.calls[name], "errors": self.errors[name]}
+            for name in self.configs
+        }
+
+    async def _simulate(self, name: str) -> bool:
+        """Задержка провайдера; False - ответить ошибкой"""
+        config = self.configs[name]
+        self.calls[name] += 1
+        delay = config.latency_ms + self.random.random() * config.jitter_ms
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if self.random.random() < config.error_rate:
+            self.errors[name] += 1
+            return False
+        return True
+
+    async def _yandex_price(self, request: web.Request) -> web.Response:
+        if not await self._simulate("yandex"):
+            return web.json_response({"message": "stub error"}, status=500)
+        payload = await request.json()
+        quantity = sum(item.get("quantity", 1) for item in payload.get("items", []))
+        price = Decimal(500) + Decimal(25) * quantity
+        return web.json_response({"price": str(price), "currency_rules": {}})
+
+    async def _paykeeper_token(self, request: web.Request) -> web.Response:
+        if not await self._simulate("paykeeper"):
+            return web.json_response({"result": "fail"}, status=500)
+        return web.json_response({"token": uuid.uuid4().hex})
+
+    async def _paykeeper_invoice(self, request: web.Request) -> web.Response:
+        if not await self._simulate("paykeeper"):
+            return web.json_response({"result": "fail"}, status=500)
+        data = await request.post()
+        invoice_id = f"{self.random.getrandbits(40):012d}"
+        return web.json_response(
+            {
+                "invoice_id": invoice_id,
+                "invoice_url": f"http://127.0.0.1:{self.port}/bill/{invoice_id}/",
+                "invoice": "",
+                "orderid": data.get("orderid"),
+            }
+        )
+
+    async def _telegram_send(self, request: web.Request) -> web.Response:
+        if not await self._simulate("telegram"):
+            return web.json_response(
+                {"ok": False, "error_code": 500, "description": "stub error"},
+                status=500,
+            )
+        return web.json_response({"ok": True, "result": {"message_id": 1}})
+
+
+def stub_configs(latency: float, jitter: float, error_rate: float, **overrides):
+    """Одни параметры для всех провайдеров; overrides: yandex=StubConfig(...)"""
+    configs = {
+        name: StubConfig(latency, jitter, error_rate)
+        for name in ("yandex", "paykeeper", "telegram")
+    }
+    configs.update(overrides)
+    return configs
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=50, help="мс")
+    parser.add_argument("--jitter", type=float, default=20, help="мс")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stubs = ProviderStubs(stub_configs(args.latency, args.jitter, args.error_rate))
+    await stubs.start(args.port)
+    for key, value in stubs.urls().items():
+        print(f"{key}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stubs.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
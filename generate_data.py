@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Скрипт для заполнения базы синтетическими данными под нагрузочные тесты
+
+    python generate_data.py --categories 2000 --products 200000 --orders 1000000
+    python generate_data.py --seed 7 --end-date 2025-01-01 --truncate
+
+Данные пишутся через COPY пачками по --chunk-size строк. С одинаковыми
+--seed и --end-date получается одна и та же база, вплоть до id. На время
+загрузки заявок триггер order_created_notify отключается (ALTER TABLE берет
+эксклюзивную блокировку "order"): запущенное приложение не получит событий
+о сгенерированных заявках.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from app.analytics.refresh import refresh_views
+from app.db import engine
+from app.orders.models import OrderStatus
+
+# Материал и плотность, кг/м3
+MATERIALS = [
+    ("сталь Ст3", 7850),
+    ("сталь 09Г2С", 7850),
+    ("оцинкованная сталь", 7850),
+    ("нержавеющая сталь", 7900),
+    ("алюминий", 2700),
+    ("медь", 8900),
+]
+# Вид проката и форма сечения для размеров и веса
+KINDS = [
+    ("Труба профильная", "tube"),
+    ("Труба круглая", "tube"),
+    ("Арматура", "rod"),
+    ("Круг", "rod"),
+    ("Квадрат", "bar"),
+    ("Полоса", "bar"),
+    ("Лист", "sheet"),
+    ("Сетка сварная", "sheet"),
+    ("Уголок", "profile"),
+    ("Швеллер", "profile"),
+    ("Балка двутавровая", "profile"),
+    ("Проволока", "rod"),
+]
+# Доли статусов; неоплаченные старше FRESH_DAYS считаются отмененными
+STATUS_WEIGHTS = {
+    OrderStatus.CREATED: 15,
+    OrderStatus.PAID: 35,
+    OrderStatus.SUCCESS: 35,
+    OrderStatus.CANCELLED: 10,
+    OrderStatus.ERROR: 5,
+}
+FRESH_DAYS = 14
+FIRST_NAMES = (
+    "Алексей Андрей Дмитрий Евгений Иван Михаил Никита Олег Павел Сергей "
+    "Анна Елена Мария Ольга Татьяна"
+).split()
+STREETS = [
+    "Невский пр.",
+    "Московский пр.",
+    "ул. Савушкина",
+    "Лиговский пр.",
+    "пр. Энгельса",
+    "Выборгское ш.",
+    "пр. Ветеранов",
+]
+MANUFACTURERS = ["Северсталь", "ММК", "НЛМК", "Евраз", "ТМК"]
+SECTION_SIZES = [10, 15, 20, 25, 30, 40, 50, 60, 80, 100, 120, 160, 200]
+LENGTHS = [1, 2, 3, 6, 6, 6, 9, 11.7, 12]
+
+CATEGORY_COLUMNS = [
+    "id",
+    "name",
+    "description",
+    "is_active",
+    "created_at",
+    "updated_at",
+]
+PRODUCT_COLUMNS = [
+    "id",
+    "name",
+    "description",
+    "rub_price",
+    "is_active",
+    "is_main",
+    "images",
+    "characteristics",
+    "weight",
+    "width",
+    "height",
+    "length",
+    "created_at",
+    "updated_at",
+    "category_id",
+]
+ORDER_COLUMNS = [
+    "id",
+    "status",
+    "amount",
+    "amount_paid",
+    "external_id",
+    "payment_data",
+    "created_at",
+    "updated_at",
+]
+# phone_digits вычисляется базой
+DETAIL_COLUMNS = [
+    "id",
+    "order_id",
+    "email",
+    "phone",
+    "first_name",
+    "address",
+    "latitude",
+    "longitude",
+    "delivery_price",
+    "comment",
+]
+LINK_COLUMNS = [
+    "order_id",
+    "product_id",
+    "quantity",
+    "unit_price",
+    "product_name",
+    "weight",
+    "width",
+    "height",
+    "length",
+]
+TABLES = ["category", "product", '"order"', "orderdetail", "orderproductlink"]
+# Архив (app.orders.archive) не генерируется, но при --truncate чистится вместе с
+# заявками, иначе в аналитике останутся старые продажи
+ARCHIVE_TABLES = ["archivedorder", "archivedproductsales"]
+# Триггер шлет pg_notify на каждую новую заявку; на массовой загрузке отключаем
+ORDER_NOTIFY_TRIGGER = "order_created_notify"
+
+
+def seeded_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def skewed_index(rng: random.Random, size: int, power: float = 2.0) -> int:
+    """Индекс с перекосом к началу списка: популярные категории и товары"""
+    return min(size - 1, int(size * rng.random() ** power))
+
+
+def money(value: float) -> Decimal:
+    return Decimal(f"{value:.2f}")
+
+
+def meters(value: float) -> Decimal:
+    return Decimal(f"{value:.4f}")
+
+
+def timestamp(rng: random.Random, end: datetime, days: int) -> datetime:
+    # Ближе к концу периода записей больше: продажи растут
+    age = days * (1 - math.sqrt(rng.random()))
+    return end - timedelta(days=age, seconds=rng.randrange(86400))
+
+
+def generate_categories(rng, count, end, categories):
+    """Категории; в categories - (id, вид проката, материал) для товаров"""
+    for index in range(count):
+        kind = KINDS[index % len(KINDS)]
+        material = MATERIALS[(index // len(KINDS)) % len(MATERIALS)]
+        series = index // (len(KINDS) * len(MATERIALS)) + 1
+        category_id = seeded_uuid(rng)
+        created_at = timestamp(rng, end, 1095)
+        categories.append((category_id, kind, material))
+        yield (
+            category_id,
+            f"{kind[0]}, {material[0]} (серия {series})",
+            f"{kind[0]} в наличии и под заказ, резка в размер",
+            rng.random() < 0.95,
+            created_at,
+            created_at,
+        )
+
+
+def product_size(rng, shape: str):
+    """Ширина, высота, длина в метрах, площадь сечения и подпись размера"""
+    length = rng.choice(LENGTHS)
+    if shape == "sheet":
+        width = rng.choice([1, 1.25, 1.5])
+        height = rng.choice([0.5, 1, 2, 3, 4, 6]) / 1000
+        label = f"{height * 1000:g}x{width * 1000:g}x{length * 1000:g} мм"
+        return width, height, length, width * height, label
+    width = rng.choice(SECTION_SIZES) / 1000
+    height = width * (rng.choice([1, 2]) if shape in ("tube", "profile") else 1)
+    if shape in ("rod", "bar"):
+        # Сплошное сечение
+        area = width * height
+        label = f"{width * 1000:g} мм, {length:g} м"
+    else:
+        wall = rng.choice([1, 1.5, 2, 3, 4, 5]) / 1000
+        area = 2 * (width + height) * wall
+        label = f"{width * 1000:g}x{height * 1000:g}x{wall * 1000:g} мм, {length:g} м"
+    return width, height, length, area, label
+
+
+def generate_products(rng, count, categories, end, snapshots):
+    """Товары; в snapshots - то, что копируется в строки заказов"""
+    for _ in range(count):
+        category_id, (kind, shape), (material, density) = categories[
+            skewed_index(rng, len(categories), 1.5)
+        ]
+        width, height, length, area, label = product_size(rng, shape)
+        weight = money(max(0.1, area * length * density))
+        price = money(max(10, float(weight) * rng.uniform(80, 400)))
+        name = f"{kind} {label}, {material}"
+        product_id = seeded_uuid(rng)
+        created_at = timestamp(rng, end, 1095)
+        gost = f"{rng.randint(8509, 30245)}-{rng.randint(70, 99)}"
+        characteristics = [
+            {"name": "Материал", "value": material, "is_main": True},
+            {"name": "ГОСТ", "value": gost},
+            {"name": "Производитель", "value": rng.choice(MANUFACTURERS)},
+        ][: rng.randint(1, 3)]
+        images = [
+            f"/api/static/products/{product_id}/{i}.jpg"
+            for i in range(rng.randint(0, 5))
+        ]
+        dimensions = (weight, meters(width), meters(height), meters(length))
+        snapshots.append((product_id, name, price, *dimensions))
+        yield (
+            product_id,
+            name,
+            f"{name}. Продажа от 1 шт, доставка по городу и области.",
+            price,
+            rng.random() < 0.97,
+            rng.random() < 0.01,
+            json.dumps(images),
+            json.dumps(characteristics, ensure_ascii=False),
+            *dimensions,
+            created_at,
+            created_at,
+            category_id,
+        )
+
+
+def generate_orders(rng, count, snapshots, end, days):
+    """Заявка, ее детали и строки заказа"""
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+    for _ in range(count):
+        order_id = seeded_uuid(rng)
+        created_at = timestamp(rng, end, days)
+        status = rng.choices(statuses, weights)[0]
+        if status == OrderStatus.CREATED and end - created_at > timedelta(FRESH_DAYS):
+            status = OrderStatus.CANCELLED
+
+        # Обычно 1-3 позиции, изредка крупные корзины
+        products = {}
+        for _ in range(min(30, 1 + int(rng.expovariate(0.6)))):
+            product = snapshots[skewed_index(rng, len(snapshots))]
+            products[product[0]] = product
+        amount = Decimal()
+        links = []
+        for product_id, name, price, *dimensions in products.values():
+            quantity = 1 + int(rng.expovariate(0.15))
+            amount += price * quantity
+            links.append((order_id, product_id, quantity, price, name, *dimensions))
+
+        delivery = rng.random() < 0.6
+        delivery_price = money(rng.uniform(500, 5000)) if delivery else Decimal()
+        paid = status in (OrderStatus.PAID, OrderStatus.SUCCESS)
+        external_id = str(rng.getrandbits(40)) if rng.random() < 0.6 else None
+        payment_data = (
+            {"payment_url": f"https://pay.example/bill/{external_id}/"}
+            if external_id
+            else {}
+        )
+        email = f"client{rng.getrandbits(32)}@example.com"
+        phone = f"+7 (9{rng.randrange(100):02d}) {rng.randrange(10**7):07d}"
+        contact = rng.random()
+        detail = (
+            seeded_uuid(rng),
+            order_id,
+            email if contact < 0.7 else None,
+            phone if contact > 0.4 else None,
+            rng.choice(FIRST_NAMES),
+            f"{rng.choice(STREETS)}, д. {rng.randint(1, 200)}" if delivery else None,
+            f"{59.8 + rng.random() * 0.3:.6f}" if delivery else None,
+            f"{30.1 + rng.random() * 0.4:.6f}" if delivery else None,
+            delivery_price,
+            "Позвонить за час" if rng.random() < 0.1 else "",
+        )
+        updated_at = created_at
+        if status != OrderStatus.CREATED:
+            updated_at += timedelta(minutes=rng.randint(1, 600))
+        order = (
+            order_id,
+            # В базе enum хранит имена: CREATED, PAID, ...
+            status.name,
+            amount,
+            amount + delivery_price if paid else Decimal(),
+            external_id,
+            json.dumps(payment_data),
+            created_at,
+            updated_at,
+        )
+        yield order, detail, links
+
+
+def progress(table: str, total: int, started: float):
+    rate = total / (time.perf_counter() - started)
+    print(f"  {table}: {total} ({rate:.0f} строк/с)", flush=True)
+
+
+async def copy_rows(connection, table, columns, rows, chunk_size):
+    """COPY пачками по chunk_size строк; rows - итератор кортежей"""
+    total, chunk, started = 0, [], time.perf_counter()
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            await connection.copy_records_to_table(
+                table, records=chunk, columns=columns
+            )
+            total += len(chunk)
+            chunk = []
+            progress(table, total, started)
+    if chunk:
+        await connection.copy_records_to_table(
+            table, records=chunk, columns=columns
+        )
+        total += len(chunk)
+        progress(table, total, started)
+
+
+async def copy_orders(connection, orders, chunk_size):
+    """Заявки с деталями и строками пачками, каждая пачка в своей транзакции"""
+    total, started = 0, time.perf_counter()
+    batch = ([], [], [])
+    for order, detail, links in orders:
+        batch[0].append(order)
+        batch[1].append(detail)
+        batch[2].extend(links)
+        if len(batch[0]) < chunk_size:
+            continue
+        total += await copy_order_batch(connection, batch)
+        batch = ([], [], [])
+        progress("order", total, started)
+    if batch[0]:
+        total += await copy_order_batch(connection, batch)
+        progress("order", total, started)
+
+
+async def copy_order_batch(connection, batch) -> int:
+    orders, details, links = batch
+    async with connection.transaction():
+        await connection.copy_records_to_table(
+            "order", records=orders, columns=ORDER_COLUMNS
+        )
+        await connection.copy_records_to_table(
+            "orderdetail", records=details, columns=DETAIL_COLUMNS
+        )
+        await connection.copy_records_to_table(
+            "orderproductlink", records=links, columns=LINK_COLUMNS
+        )
+    return len(orders)
+
+
+async def generate_data(args):
+    """Генерация и загрузка данных"""
+    rng = random.Random(args.seed)
+    end = datetime.combine(args.end_date, datetime.min.time())
+
+    async with engine.connect() as sa_connection:
+        # COPY есть только у самого asyncpg, берем его соединение
+        raw = await sa_connection.get_raw_connection()
+        connection = raw.driver_connection
+        if args.truncate:
+            print("Удаление текущих категорий, товаров, заявок и архива")
+            tables = [*ARCHIVE_TABLES, *reversed(TABLES)]
+            await connection.execute(f"TRUNCATE {', '.join(tables)}")
+
+        categories = []
+        await copy_rows(
+            connection,
+            "category",
+            CATEGORY_COLUMNS,
+            generate_categories(rng, args.categories, end, categories),
+            args.chunk_size,
+        )
+        snapshots = []
+        await copy_rows(
+            connection,
+            "product",
+            PRODUCT_COLUMNS,
+            generate_products(rng, args.products, categories, end, snapshots),
+            args.chunk_size,
+        )
+        if args.orders:
+            # Популярность товара (skewed_index) не связана с категорией
+            rng.shuffle(snapshots)
+            await connection.execute(
+                f'ALTER TABLE "order" DISABLE TRIGGER {ORDER_NOTIFY_TRIGGER}'
+            )
+            try:
+                await copy_orders(
+                    connection,
+                    generate_orders(rng, args.orders, snapshots, end, args.days),
+                    args.chunk_size,
+                )
+            finally:
+                await connection.execute(
+                    f'ALTER TABLE "order" ENABLE TRIGGER {ORDER_NOTIFY_TRIGGER}'
+                )
+
+        print("ANALYZE")
+        for table in TABLES:
+            await connection.execute(f"ANALYZE {table}")
+
+    if args.orders and not await refresh_views():
+        print("Вьюхи аналитики сейчас обновляет другой процесс")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--categories", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=730, help="Период заявок, дни")
+    parser.add_argument(
+        "--end-date",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="Последний день заявок, YYYY-MM-DD (по умолчанию сегодня)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Удалить текущие категории, товары, заявки и архив перед загрузкой",
+    )
+    started = time.perf_counter()
+    asyncio.run(generate_data(parser.parse_args()))
+    print(f"Готово за {time.perf_counter() - started:.0f} с")
@@ -8,7 +8,13 @@ from sqlmodel import SQLModel
 from alembic import context
 
 from app.products.models import Product
-from app.orders.models import Order, OrderDetail, OrderProductLink
+from app.orders.models import (
+    ArchivedOrder,
+    ArchivedProductSales,
+    Order,
+    OrderDetail,
+    OrderProductLink,
+)
 from app.users.models import User
 from app.categories.models import Category
 
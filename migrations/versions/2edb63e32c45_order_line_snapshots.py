@@ -0,0 +1,105 @@
+"""Order line snapshots
+
+Revision ID: 2edb63e32c45
+Revises: 92189fcfac21
+Create Date: 2026-10-19 13:41:52.209481
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2edb63e32c45"
+down_revision: Union[str, Sequence[str], None] = "92189fcfac21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRODUCT_SALES_FROM_LINES = """
+    CREATE MATERIALIZED VIEW product_sales AS
+    SELECT
+        l.product_id AS product_id,
+        max(l.product_name) AS name,
+        count(DISTINCT l.order_id) AS orders_count,
+        sum(l.quantity) AS quantity,
+        sum(l.quantity * l.unit_price) AS revenue
+    FROM orderproductlink l
+    JOIN "order" o ON o.id = l.order_id
+    WHERE o.status IN ('PAID', 'SUCCESS')
+    GROUP BY l.product_id
+"""
+
+PRODUCT_SALES_FROM_CATALOG = """
+    CREATE MATERIALIZED VIEW product_sales AS
+    SELECT
+        l.product_id AS product_id,
+        p.name AS name,
+        count(DISTINCT l.order_id) AS orders_count,
+        sum(l.quantity) AS quantity,
+        sum(l.quantity * p.rub_price) AS revenue
+    FROM orderproductlink l
+    JOIN "order" o ON o.id = l.order_id
+    JOIN product p ON p.id = l.product_id
+    WHERE o.status IN ('PAID', 'SUCCESS')
+    GROUP BY l.product_id, p.name
+"""
+
+
+def _create_product_sales(definition: str):
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS product_sales")
+    op.execute(definition)
+    op.execute("CREATE UNIQUE INDEX ix_product_sales_product_id ON product_sales (product_id)")
+    op.execute("CREATE INDEX ix_product_sales_quantity ON product_sales (quantity DESC)")
+    op.execute("CREATE INDEX ix_product_sales_revenue ON product_sales (revenue DESC)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "orderproductlink",
+        sa.Column("unit_price", sa.Numeric(precision=12, scale=2), nullable=True),
+    )
+    op.add_column(
+        "orderproductlink",
+        sa.Column("product_name", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.add_column("orderproductlink", sa.Column("weight", sa.Numeric(), nullable=True))
+    op.add_column("orderproductlink", sa.Column("width", sa.Numeric(), nullable=True))
+    op.add_column("orderproductlink", sa.Column("height", sa.Numeric(), nullable=True))
+    op.add_column("orderproductlink", sa.Column("length", sa.Numeric(), nullable=True))
+
+    # Заполняем снимки существующих заказов текущими данными каталога
+    op.execute(
+        """
+        UPDATE orderproductlink l
+        SET unit_price = p.rub_price,
+            product_name = p.name,
+            weight = p.weight,
+            width = p.width,
+            height = p.height,
+            length = p.length
+        FROM product p
+        WHERE p.id = l.product_id
+        """
+    )
+    op.execute("UPDATE orderproductlink SET unit_price = 0 WHERE unit_price IS NULL")
+    op.execute("UPDATE orderproductlink SET product_name = '' WHERE product_name IS NULL")
+    op.alter_column("orderproductlink", "unit_price", nullable=False)
+    op.alter_column("orderproductlink", "product_name", nullable=False)
+
+    _create_product_sales(PRODUCT_SALES_FROM_LINES)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _create_product_sales(PRODUCT_SALES_FROM_CATALOG)
+    op.drop_column("orderproductlink", "length")
+    op.drop_column("orderproductlink", "height")
+    op.drop_column("orderproductlink", "width")
+    op.drop_column("orderproductlink", "weight")
+    op.drop_column("orderproductlink", "product_name")
+    op.drop_column("orderproductlink", "unit_price")
@@ -0,0 +1,156 @@
+"""Order archive
+
+Revision ID: 50bab33d466e
+Revises: 2edb63e32c45
+Create Date: 2026-10-19 14:58:33.170264
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "50bab33d466e"
+down_revision: Union[str, Sequence[str], None] = "2edb63e32c45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+order_status = postgresql.ENUM(
+    "CREATED",
+    "CANCELLED",
+    "PAID",
+    "ERROR",
+    "SUCCESS",
+    name="orderstatus",
+    create_type=False,
+)
+
+# Аналитика учитывает и заархивированные заявки
+SALES_DAILY_WITH_ARCHIVE = """
+    CREATE MATERIALIZED VIEW sales_daily AS
+    SELECT
+        date_trunc('day', created_at)::date AS day,
+        status,
+        count(*) AS orders_count,
+        coalesce(sum(amount), 0) AS amount,
+        coalesce(sum(amount_paid), 0) AS amount_paid,
+        coalesce(sum(delivery_price), 0) AS delivery_price_sum,
+        count(delivery_price) AS delivery_count
+    FROM (
+        SELECT o.created_at, o.status, o.amount, o.amount_paid, d.delivery_price
+        FROM "order" o
+        LEFT JOIN orderdetail d ON d.order_id = o.id
+        UNION ALL
+        SELECT created_at, status, amount, amount_paid, delivery_price
+        FROM archivedorder
+    ) orders
+    GROUP BY 1, 2
+"""
+
+SALES_DAILY_HOT_ONLY = """
+    CREATE MATERIALIZED VIEW sales_daily AS
+    SELECT
+        date_trunc('day', o.created_at)::date AS day,
+        o.status AS status,
+        count(*) AS orders_count,
+        coalesce(sum(o.amount), 0) AS amount,
+        coalesce(sum(o.amount_paid), 0) AS amount_paid,
+        coalesce(sum(d.delivery_price), 0) AS delivery_price_sum,
+        count(d.id) AS delivery_count
+    FROM "order" o
+    LEFT JOIN orderdetail d ON d.order_id = o.id
+    GROUP BY 1, 2
+"""
+
+PRODUCT_SALES_WITH_ARCHIVE = """
+    CREATE MATERIALIZED VIEW product_sales AS
+    SELECT
+        product_id,
+        max(name) AS name,
+        sum(orders_count) AS orders_count,
+        sum(quantity) AS quantity,
+        sum(revenue) AS revenue
+    FROM (
+        SELECT
+            l.product_id,
+            max(l.product_name) AS name,
+            count(DISTINCT l.order_id) AS orders_count,
+            sum(l.quantity) AS quantity,
+            sum(l.quantity * l.unit_price) AS revenue
+        FROM orderproductlink l
+        JOIN "order" o ON o.id = l.order_id
+        WHERE o.status IN ('PAID', 'SUCCESS')
+        GROUP BY l.product_id
+        UNION ALL
+        SELECT product_id, product_name, orders_count, quantity, revenue
+        FROM archivedproductsales
+    ) sales
+    GROUP BY product_id
+"""
+
+PRODUCT_SALES_HOT_ONLY = """
+    CREATE MATERIALIZED VIEW product_sales AS
+    SELECT
+        l.product_id AS product_id,
+        max(l.product_name) AS name,
+        count(DISTINCT l.order_id) AS orders_count,
+        sum(l.quantity) AS quantity,
+        sum(l.quantity * l.unit_price) AS revenue
+    FROM orderproductlink l
+    JOIN "order" o ON o.id = l.order_id
+    WHERE o.status IN ('PAID', 'SUCCESS')
+    GROUP BY l.product_id
+"""
+
+
+def _create_views(sales_daily: str, product_sales: str):
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS sales_daily")
+    op.execute(sales_daily)
+    op.execute("CREATE UNIQUE INDEX ix_sales_daily_day_status ON sales_daily (day, status)")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS product_sales")
+    op.execute(product_sales)
+    op.execute("CREATE UNIQUE INDEX ix_product_sales_product_id ON product_sales (product_id)")
+    op.execute("CREATE INDEX ix_product_sales_quantity ON product_sales (quantity DESC)")
+    op.execute("CREATE INDEX ix_product_sales_revenue ON product_sales (revenue DESC)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "archivedorder",
+        sa.Column("order_id", sqlmodel.sql.sqltypes.GUID(), nullable=False),
+        sa.Column("file", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("status", order_status, nullable=False),
+        sa.Column("amount", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("amount_paid", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("delivery_price", sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("order_id"),
+    )
+    op.create_index(
+        op.f("ix_archivedorder_created_at"), "archivedorder", ["created_at"]
+    )
+    op.create_table(
+        "archivedproductsales",
+        sa.Column("product_id", sqlmodel.sql.sqltypes.GUID(), nullable=False),
+        sa.Column("product_name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("orders_count", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+    _create_views(SALES_DAILY_WITH_ARCHIVE, PRODUCT_SALES_WITH_ARCHIVE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _create_views(SALES_DAILY_HOT_ONLY, PRODUCT_SALES_HOT_ONLY)
+    op.drop_table("archivedproductsales")
+    op.drop_index(op.f("ix_archivedorder_created_at"), table_name="archivedorder")
+    op.drop_table("archivedorder")
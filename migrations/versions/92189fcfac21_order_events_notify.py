@@ -0,0 +1,71 @@
+"""Order events notify
+
+Revision ID: 92189fcfac21
+Revises: c2e12a0bdb20
+Create Date: 2026-10-19 12:20:05.611734
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "92189fcfac21"
+down_revision: Union[str, Sequence[str], None] = "c2e12a0bdb20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Сквозной номер события, по нему клиенты догоняют пропущенное (Last-Event-ID)
+    op.execute("CREATE SEQUENCE order_event_seq")
+    op.execute(
+        """
+        CREATE FUNCTION notify_order_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify(
+                'order_events',
+                json_build_object(
+                    'id', nextval('order_event_seq'),
+                    'type', CASE WHEN TG_OP = 'INSERT' THEN 'created' ELSE 'status' END,
+                    'order_id', NEW.id,
+                    'status', lower(NEW.status::text),
+                    'amount', NEW.amount,
+                    'amount_paid', NEW.amount_paid,
+                    'updated_at', NEW.updated_at
+                )::text
+            );
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER order_created_notify
+        AFTER INSERT ON "order"
+        FOR EACH ROW EXECUTE FUNCTION notify_order_event()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER order_status_notify
+        AFTER UPDATE OF status ON "order"
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status)
+        EXECUTE FUNCTION notify_order_event()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS order_status_notify ON "order"')
+    op.execute('DROP TRIGGER IF EXISTS order_created_notify ON "order"')
+    op.execute("DROP FUNCTION IF EXISTS notify_order_event()")
+    op.execute("DROP SEQUENCE IF EXISTS order_event_seq")
@@ -0,0 +1,69 @@
+"""Order search trigram indexes
+
+Revision ID: c2e12a0bdb20
+Revises: fb94a672e099
+Create Date: 2026-10-19 11:02:17.843120
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c2e12a0bdb20"
+down_revision: Union[str, Sequence[str], None] = "fb94a672e099"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        "orderdetail",
+        sa.Column(
+            "phone_digits",
+            sa.String(),
+            sa.Computed(
+                "right(regexp_replace(phone, '\\D', '', 'g'), 10)", persisted=True
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        op.f("ix_orderdetail_phone_digits"), "orderdetail", ["phone_digits"]
+    )
+    op.create_index(op.f("ix_order_external_id"), "order", ["external_id"])
+
+    op.execute(
+        'CREATE INDEX ix_order_id_trgm ON "order" '
+        "USING gin ((id::text) gin_trgm_ops)"
+    )
+    op.execute(
+        'CREATE INDEX ix_order_external_id_trgm ON "order" '
+        "USING gin (external_id gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_orderdetail_email_trgm ON orderdetail "
+        "USING gin (email gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_orderdetail_phone_digits_trgm ON orderdetail "
+        "USING gin (phone_digits gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_orderdetail_phone_digits_trgm", table_name="orderdetail")
+    op.drop_index("ix_orderdetail_email_trgm", table_name="orderdetail")
+    op.drop_index("ix_order_external_id_trgm", table_name="order")
+    op.drop_index("ix_order_id_trgm", table_name="order")
+    op.drop_index(op.f("ix_order_external_id"), table_name="order")
+    op.drop_index(op.f("ix_orderdetail_phone_digits"), table_name="orderdetail")
+    op.drop_column("orderdetail", "phone_digits")
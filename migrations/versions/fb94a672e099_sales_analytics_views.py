@@ -0,0 +1,71 @@
+"""Sales analytics views
+
+Revision ID: fb94a672e099
+Revises: e31bde81997a
+Create Date: 2026-10-19 10:12:41.517204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "fb94a672e099"
+down_revision: Union[str, Sequence[str], None] = "e31bde81997a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Заявки и выручка по дням в разрезе статусов.
+    # Неделя и месяц считаются из этой вьюхи, она маленькая.
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW sales_daily AS
+        SELECT
+            date_trunc('day', o.created_at)::date AS day,
+            o.status AS status,
+            count(*) AS orders_count,
+            coalesce(sum(o.amount), 0) AS amount,
+            coalesce(sum(o.amount_paid), 0) AS amount_paid,
+            coalesce(sum(d.delivery_price), 0) AS delivery_price_sum,
+            count(d.id) AS delivery_count
+        FROM "order" o
+        LEFT JOIN orderdetail d ON d.order_id = o.id
+        GROUP BY 1, 2
+        """
+    )
+    # Уникальный индекс обязателен для REFRESH ... CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ix_sales_daily_day_status ON sales_daily (day, status)")
+
+    # Продажи по товарам, только оплаченные заявки
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW product_sales AS
+        SELECT
+            l.product_id AS product_id,
+            p.name AS name,
+            count(DISTINCT l.order_id) AS orders_count,
+            sum(l.quantity) AS quantity,
+            sum(l.quantity * p.rub_price) AS revenue
+        FROM orderproductlink l
+        JOIN "order" o ON o.id = l.order_id
+        JOIN product p ON p.id = l.product_id
+        WHERE o.status IN ('PAID', 'SUCCESS')
+        GROUP BY l.product_id, p.name
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX ix_product_sales_product_id ON product_sales (product_id)")
+    op.execute("CREATE INDEX ix_product_sales_quantity ON product_sales (quantity DESC)")
+    op.execute("CREATE INDEX ix_product_sales_revenue ON product_sales (revenue DESC)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS product_sales")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS sales_daily")